@@ -4,25 +4,74 @@ Amazon Clickstream Data Generator
 Generates synthetic clickstream data simulating user behavior on Amazon.com
 
 Usage:
-    python generate_clickstream.py [num_records]
+    python generate_clickstream.py [num_records] [output_file] [--profile NAME] [--seed N]
+                                   [--format csv|compact] [--catalog-file PATH]
 
-Default: 10,000 records
+Default: 10,000 records, 'uniform' profile, seed 42, csv format
+
+Workload profiles (see WORKLOAD_PROFILES) control user/product cardinality,
+Zipf popularity skew, session length and diurnal traffic. Output is fully
+determined by the profile, the seed and the record count.
+
+Every run also writes the product catalog dimension (product_code, product_id,
+product_name, category, price). Product ids are derived from the catalog position,
+so they are stable across runs and processes. The 'compact' format stores events
+as integer codes only (ts, user_code, session_code, product_code, action_code);
+the Spark job joins the catalog back in for output rows.
 """
 
+import argparse
+import bisect
+import calendar
 import csv
+import itertools
+import math
 import random
-import sys
 from datetime import datetime, timedelta
 
 # Configuration
 PRODUCT_CATEGORIES = ['Electronics', 'Books', 'Clothing', 'Home', 'Sports',
                      'Toys', 'Beauty', 'Automotive', 'Garden', 'Food']
 
-ACTIONS = ['view', 'click', 'add_to_cart', 'purchase']
+ACTIONS = ['view', 'click', 'add_to_cart', 'purchase']  # action_code = list index
 
 # Action weights (view is most common, purchase is least common)
 ACTION_WEIGHTS = [50, 30, 15, 5]
 
+# Relative traffic per hour of day (0-23): quiet night, lunch bump, evening peak
+HOURLY_TRAFFIC = [2, 1, 1, 1, 1, 2, 4, 6, 8, 9, 9, 10,
+                  11, 10, 9, 9, 10, 12, 14, 16, 16, 13, 8, 4]
+
+# Named workload profiles
+#   num_users / num_products: cardinalities (num_products=None keeps the base catalog)
+#   user_skew / product_skew: Zipf exponent of popularity (0 = uniform)
+#   mean_session_events: average number of events in one session
+#   days: length of the simulated time window
+#   diurnal: follow HOURLY_TRAFFIC instead of uniform time of day
+WORKLOAD_PROFILES = {
+    'uniform': dict(num_users=1000, num_products=None, user_skew=0.0, product_skew=0.0,
+                    mean_session_events=2, days=30, diurnal=False),
+    'skewed': dict(num_users=20000, num_products=5000, user_skew=1.0, product_skew=1.2,
+                   mean_session_events=6, days=30, diurnal=True),
+    'large': dict(num_users=2000000, num_products=1000000, user_skew=1.05, product_skew=1.1,
+                  mean_session_events=8, days=90, diurnal=True),
+}
+
+# Seed of the catalog dimension (prices); fixed so every run shares one catalog
+CATALOG_SEED = 0
+
+# Fixed start of the time window so seeded runs are reproducible
+DEFAULT_START_DATE = '2024-10-01'
+
+# Output columns per event format
+EVENT_FIELDS = {
+    'csv': ['timestamp', 'user_id', 'session_id', 'product_id',
+            'product_name', 'category', 'action', 'price'],
+    'compact': ['ts', 'user_code', 'session_code', 'product_code', 'action_code'],
+}
+
+CATALOG_FIELDS = ['product_code', 'product_id', 'product_name', 'category', 'price']
+
 # Sample product names per category
 PRODUCTS = {
     'Electronics': ['iPhone 14 Pro', 'Samsung TV 55"', 'Sony Headphones', 'iPad Air', 'Dell Laptop',
@@ -48,100 +97,264 @@ PRODUCTS = {
 }
 
 
-def generate_clickstream(num_records=10000, output_file='clickstream_large.txt'):
-    """Generate synthetic clickstream data"""
-
-    print(f"🔄 Generating {num_records:,} clickstream records...")
-
-    # Start date: 30 days ago
-    start_date = datetime.now() - timedelta(days=30)
-
-    records = []
-
-    for i in range(num_records):
-        # Generate timestamp (random time in last 30 days)
-        random_seconds = random.randint(0, 30 * 24 * 60 * 60)
-        timestamp = start_date + timedelta(seconds=random_seconds)
-
-        # Generate user_id (simulate 1000 unique users)
-        user_id = f"user_{random.randint(1, 1000):04d}"
-
-        # Select random category and product
-        category = random.choice(PRODUCT_CATEGORIES)
-        product = random.choice(PRODUCTS[category])
-        product_id = f"{category[:3].upper()}_{abs(hash(product)) % 100000:05d}"
+class ZipfSampler:
+    """
+    Draws ranks 0..n-1 with probability proportional to 1 / (rank + 1) ** skew
+
+    Uses a cumulative weight table and binary search, so sampling is O(log n)
+    and works for millions of keys. skew=0 degrades to uniform sampling.
+    """
+
+    def __init__(self, n, skew, rng):
+        self.n = n
+        self.rng = rng
+        self.cumulative = None
+        if skew > 0:
+            self.cumulative = list(itertools.accumulate(1.0 / (rank + 1) ** skew for rank in range(n)))
+
+    def sample(self):
+        if self.cumulative is None:
+            return self.rng.randrange(self.n)
+        point = self.rng.random() * self.cumulative[-1]
+        return min(bisect.bisect_right(self.cumulative, point), self.n - 1)
+
+
+def build_catalog(num_products=None):
+    """
+    Build the product catalog: the named base products first, then synthetic
+    products spread round-robin across categories up to `num_products`
+
+    product_code is the catalog position and product_id is derived from it, so
+    both are identical in every run and process for the same catalog size.
+    Prices come from a dedicated RNG seeded with CATALOG_SEED, independent of
+    the event seed, and product i always gets the i-th price, so catalogs of
+    different sizes agree on their common products.
+
+    Returns:
+        List of (product_code, product_id, product_name, category, price) tuples
+    """
+    rng = random.Random(CATALOG_SEED)
+
+    catalog = [(category, product) for category in PRODUCT_CATEGORIES for product in PRODUCTS[category]]
+
+    if num_products is not None:
+        catalog = catalog[:num_products]
+        for i in range(len(catalog), num_products):
+            category = PRODUCT_CATEGORIES[i % len(PRODUCT_CATEGORIES)]
+            catalog.append((category, f"{category} Item {i:07d}"))
+
+    return [
+        (code, f"{category[:3].upper()}_{code:05d}", product, category, round(rng.uniform(9.99, 999.99), 2))
+        for code, (category, product) in enumerate(catalog)
+    ]
+
+
+def write_catalog(catalog, catalog_file):
+    """Write the product catalog dimension as CSV"""
+    with open(catalog_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(CATALOG_FIELDS)
+        writer.writerows(catalog)
+
+
+def _session_length(rng, mean_events):
+    """
+    Number of events in a session: 1 + a geometric draw, so the mean is `mean_events`
+    """
+    if mean_events <= 1:
+        return 1
+    # P(extra = k) = (1 - p) ** k * p has mean (1 - p) / p = mean_events - 1
+    p = 1.0 / mean_events
+    return 1 + int(math.log(1.0 - rng.random()) / math.log(1.0 - p))
+
+
+def _session_start_offset(rng, days, diurnal, hour_weights):
+    """Seconds from the window start at which a new session begins"""
+    if not diurnal:
+        return rng.randint(0, days * 24 * 60 * 60)
+
+    day = rng.randrange(days)
+    hour = rng.choices(range(24), cum_weights=hour_weights, k=1)[0]
+    return ((day * 24 + hour) * 60 + rng.randrange(60)) * 60 + rng.randrange(60)
+
+
+def generate_clickstream(num_records=10000, output_file='clickstream_large.txt', profile='uniform',
+                         seed=42, start_date=DEFAULT_START_DATE, event_format='csv',
+                         catalog_file='product_catalog.csv', **overrides):
+    """
+    Generate synthetic clickstream data
+
+    Args:
+        num_records: Number of events to generate
+        output_file: CSV output path
+        profile: Name of a WORKLOAD_PROFILES entry
+        seed: Random seed (same seed + profile + count => same file)
+        start_date: First day of the simulated window (YYYY-MM-DD)
+        event_format: 'csv' (denormalized strings) or 'compact' (integer codes only)
+        catalog_file: Output path of the product catalog dimension
+        **overrides: Profile settings to override (e.g. num_users=50000)
+    """
+    settings = dict(WORKLOAD_PROFILES[profile])
+    settings.update({key: value for key, value in overrides.items() if value is not None})
+
+    rng = random.Random(seed)
+
+    print(f"🔄 Generating {num_records:,} clickstream records (profile '{profile}', seed {seed})...")
+
+    catalog = build_catalog(settings['num_products'])
+    write_catalog(catalog, catalog_file)
+    num_users = settings['num_users']
+
+    # Popularity rank -> product / user index, shuffled so hot keys are spread out
+    product_by_rank = list(range(len(catalog)))
+    rng.shuffle(product_by_rank)
+    user_by_rank = list(range(1, num_users + 1))
+    rng.shuffle(user_by_rank)
+
+    product_sampler = ZipfSampler(len(catalog), settings['product_skew'], rng)
+    user_sampler = ZipfSampler(num_users, settings['user_skew'], rng)
+    hour_weights = list(itertools.accumulate(HOURLY_TRAFFIC))
+    action_weights = list(itertools.accumulate(ACTION_WEIGHTS))
+
+    window_start = datetime.strptime(start_date, '%Y-%m-%d')
+    window_start_epoch = calendar.timegm(window_start.timetuple())
+    compact = event_format == 'compact'
+    window_seconds = settings['days'] * 24 * 60 * 60
+    progress_every = max(1000, num_records // 20)
 
-        # Select action based on weights
-        action = random.choices(ACTIONS, weights=ACTION_WEIGHTS, k=1)[0]
-
-        # Add some session information
-        session_id = f"sess_{random.randint(1, 5000):05d}"
-
-        # Create record
-        record = {
-            'timestamp': timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-            'user_id': user_id,
-            'session_id': session_id,
-            'product_id': product_id,
-            'product_name': product,
-            'category': category,
-            'action': action,
-            'price': round(random.uniform(9.99, 999.99), 2)
-        }
-
-        records.append(record)
-
-        # Progress indicator
-        if (i + 1) % 1000 == 0:
-            print(f"  Generated {i + 1:,} records...")
+    action_counts = {}
+    category_counts = {}
+    product_counts = {}
+    users_seen = set()
+    first_timestamp = last_timestamp = None
+    num_sessions = 0
+    generated = 0
 
-    # Write to CSV file
     print(f"\n📝 Writing to {output_file}...")
 
-    fieldnames = ['timestamp', 'user_id', 'session_id', 'product_id',
-                 'product_name', 'category', 'action', 'price']
-
     with open(output_file, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(records)
+        writer = csv.writer(f)
+        writer.writerow(EVENT_FIELDS[event_format])
+
+        while generated < num_records:
+            # A session belongs to one user and covers a contiguous time span
+            num_sessions += 1
+            session_id = f"sess_{num_sessions:05d}"
+            user_code = user_by_rank[user_sampler.sample()]
+            user_id = f"user_{user_code:04d}"
+            users_seen.add(user_code)
+
+            session_events = min(_session_length(rng, settings['mean_session_events']),
+                                 num_records - generated)
+            gaps = [rng.randint(5, 300) for _ in range(session_events - 1)]
+
+            # Sessions starting near the end of the window are moved back so they fit in it
+            offset = _session_start_offset(rng, settings['days'], settings['diurnal'], hour_weights)
+            offset = max(min(offset, window_seconds - sum(gaps)), 0)
+
+            for gap in gaps + [0]:
+                timestamp = window_start + timedelta(seconds=offset)
+                ts = window_start_epoch + offset
+                offset += gap
+
+                product_index = product_by_rank[product_sampler.sample()]
+                product_code, product_id, product, category, price = catalog[product_index]
+
+                # Select action based on weights
+                action_code = rng.choices(range(len(ACTIONS)), cum_weights=action_weights, k=1)[0]
+                action = ACTIONS[action_code]
+
+                if compact:
+                    writer.writerow([ts, user_code, num_sessions,
+                                     product_code, action_code])
+                else:
+                    writer.writerow([timestamp.strftime('%Y-%m-%d %H:%M:%S'), user_id, session_id,
+                                     product_id, product, category, action, price])
+
+                action_counts[action] = action_counts.get(action, 0) + 1
+                category_counts[category] = category_counts.get(category, 0) + 1
+                product_counts[product_index] = product_counts.get(product_index, 0) + 1
+                if first_timestamp is None or timestamp < first_timestamp:
+                    first_timestamp = timestamp
+                if last_timestamp is None or timestamp > last_timestamp:
+                    last_timestamp = timestamp
+
+                generated += 1
+
+                # Progress indicator
+                if generated % progress_every == 0:
+                    print(f"  Generated {generated:,} records...")
 
     # Print statistics
+    hottest_share = max(product_counts.values()) / num_records * 100 if product_counts else 0.0
+
     print(f"\n✅ Successfully generated {num_records:,} records!")
     print(f"📊 Statistics:")
-    print(f"   - Unique users: ~1,000")
+    print(f"   - Profile: {profile} (seed {seed})")
+    print(f"   - Unique users: {len(users_seen):,} of {num_users:,}")
+    print(f"   - Sessions: {num_sessions:,}")
+    print(f"   - Products touched: {len(product_counts):,} of {len(catalog):,}")
+    print(f"   - Hottest product share: {hottest_share:.2f}%")
     print(f"   - Categories: {len(PRODUCT_CATEGORIES)}")
-    print(f"   - Date range: {records[0]['timestamp']} to {records[-1]['timestamp']}")
-    print(f"   - File: {output_file}")
-
-    # Action distribution
-    action_counts = {}
-    for record in records:
-        action_counts[record['action']] = action_counts.get(record['action'], 0) + 1
+    print(f"   - Date range: {first_timestamp:%Y-%m-%d %H:%M:%S} to {last_timestamp:%Y-%m-%d %H:%M:%S}")
+    print(f"   - File: {output_file} ({event_format} format)")
+    print(f"   - Catalog: {catalog_file}")
 
     print(f"\n📈 Action Distribution:")
     for action, count in sorted(action_counts.items(), key=lambda x: x[1], reverse=True):
         percentage = (count / num_records) * 100
         print(f"   - {action:15s}: {count:6,} ({percentage:5.2f}%)")
 
-    # Category distribution
-    category_counts = {}
-    for record in records:
-        category_counts[record['category']] = category_counts.get(record['category'], 0) + 1
-
     print(f"\n🏷️  Top 5 Categories:")
     for category, count in sorted(category_counts.items(), key=lambda x: x[1], reverse=True)[:5]:
         percentage = (count / num_records) * 100
         print(f"   - {category:15s}: {count:6,} ({percentage:5.2f}%)")
 
 
-if __name__ == '__main__':
-    # Get number of records from command line argument
-    num_records = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Generate synthetic Amazon clickstream data")
+    parser.add_argument('num_records', nargs='?', type=int, default=10000)
+    parser.add_argument('output_file', nargs='?', default='clickstream_large.txt')
+    parser.add_argument('--profile', choices=sorted(WORKLOAD_PROFILES), default='uniform',
+                        help="Workload profile")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed")
+    parser.add_argument('--format', dest='event_format', choices=sorted(EVENT_FIELDS), default='csv',
+                        help="Event format: denormalized csv or integer-coded compact")
+    parser.add_argument('--catalog-file', default='product_catalog.csv',
+                        help="Output path of the product catalog dimension")
+    parser.add_argument('--start-date', default=DEFAULT_START_DATE,
+                        help="First day of the simulated window (YYYY-MM-DD)")
+    parser.add_argument('--users', dest='num_users', type=int, help="Override number of users")
+    parser.add_argument('--products', dest='num_products', type=int, help="Override number of products")
+    parser.add_argument('--user-skew', type=float, help="Override Zipf exponent for users")
+    parser.add_argument('--product-skew', type=float, help="Override Zipf exponent for products")
+    parser.add_argument('--session-events', dest='mean_session_events', type=float,
+                        help="Override mean events per session")
+    parser.add_argument('--days', type=int, help="Override length of the time window")
+    parser.add_argument('--diurnal', action=argparse.BooleanOptionalAction, default=None,
+                        help="Override diurnal traffic curve")
+    return parser.parse_args(argv)
 
-    # Get output file name from command line argument
-    output_file = sys.argv[2] if len(sys.argv) > 2 else 'clickstream_large.txt'
 
-    generate_clickstream(num_records, output_file)
+if __name__ == '__main__':
+    args = parse_args()
+
+    generate_clickstream(
+        args.num_records,
+        args.output_file,
+        profile=args.profile,
+        seed=args.seed,
+        start_date=args.start_date,
+        event_format=args.event_format,
+        catalog_file=args.catalog_file,
+        num_users=args.num_users,
+        num_products=args.num_products,
+        user_skew=args.user_skew,
+        product_skew=args.product_skew,
+        mean_session_events=args.mean_session_events,
+        days=args.days,
+        diurnal=args.diurnal
+    )
 
     print(f"\n🎉 Data generation complete! Ready for HDFS upload.")
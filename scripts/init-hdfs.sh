@@ -30,6 +30,12 @@ docker exec namenode hdfs dfs -mkdir -p /data
 echo -e "${YELLOW}📤 Uploading clickstream data to HDFS...${NC}"
 docker exec namenode hdfs dfs -put -f /data/clickstream_large.txt /data/
 
+# The generator writes the product catalog next to the events; needed for --catalog
+if [ -f "data/product_catalog.csv" ]; then
+    echo -e "${YELLOW}📤 Uploading product catalog to HDFS...${NC}"
+    docker exec namenode hdfs dfs -put -f /data/product_catalog.csv /data/
+fi
+
 echo -e "${GREEN}✅ Data uploaded successfully!${NC}\n"
 
 echo -e "${YELLOW}📊 Verifying upload...${NC}"
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+ALS Benchmark
+Measures training and top-K scoring time of the personalized recommendation
+stage as the number of users and products grows
+
+Interactions are synthesized directly in Spark (seeded, skewed towards popular
+products) and fed through the same train_als() / recommend_top_k() code path
+as find_recommendations.py.
+
+Usage:
+    spark-submit --py-files hbase_connector.py,job_metrics.py,find_recommendations.py \
+        benchmark_als.py --scales 10000x1000,100000x10000,1000000x100000 --output als_benchmark.json
+"""
+
+import argparse
+import json
+import time
+
+from pyspark.sql.functions import col, floor, pow as spark_pow, rand, sum as spark_sum, format_string
+
+from find_recommendations import create_spark_session, train_als, recommend_top_k
+
+
+def synthetic_interactions(spark, num_users, num_items, interactions_per_user=20, skew=3.0, seed=42):
+    """
+    Generate user x product interaction strengths
+
+    Item popularity follows rand() ** skew, so low item indices are hot keys.
+
+    Returns:
+        Tuple of (interactions, users, items) DataFrames as in build_interactions()
+    """
+    events = spark.range(num_users * interactions_per_user).select(
+        floor(rand(seed) * num_users).cast("int").alias("user_idx"),
+        floor(spark_pow(rand(seed + 1), skew) * num_items).cast("int").alias("item_idx"),
+        (floor(rand(seed + 2) * 10) + 1).cast("double").alias("weight")
+    )
+
+    interactions = events.groupBy("user_idx", "item_idx").agg(spark_sum("weight").alias("strength"))
+    users = spark.range(num_users).select(
+        col("id").cast("int").alias("user_idx"),
+        format_string("user_%04d", col("id")).alias("user_id")
+    )
+    items = spark.range(num_items).select(
+        col("id").cast("int").alias("item_idx"),
+        format_string("PRD_%05d", col("id")).alias("product_id")
+    )
+    return interactions, users, items
+
+
+def run_benchmark(spark, num_users, num_items, k=10, rank=10, max_iter=10, block_size=4096):
+    """Train and score one scale point, returning timings in seconds"""
+    interactions, users, items = synthetic_interactions(spark, num_users, num_items)
+    interactions = interactions.cache()
+    pairs = interactions.count()
+
+    start_time = time.time()
+    model = train_als(interactions, rank=rank, max_iter=max_iter, block_size=block_size)
+    train_time = time.time() - start_time
+
+    # The noop sink forces full evaluation without collecting to the driver
+    start_time = time.time()
+    recommend_top_k(model, users, items, k).write.format("noop").mode("overwrite").save()
+    score_time = time.time() - start_time
+
+    interactions.unpersist()
+
+    return {
+        "users": num_users,
+        "products": num_items,
+        "interactions": pairs,
+        "rank": rank,
+        "k": k,
+        "block_size": block_size,
+        "train_seconds": round(train_time, 2),
+        "score_seconds": round(score_time, 2),
+    }
+
+
+def parse_scales(value):
+    """Parse '10000x1000,100000x10000' into [(10000, 1000), (100000, 10000)]"""
+    scales = []
+    for item in value.split(","):
+        users, items = item.lower().split("x")
+        scales.append((int(users), int(items)))
+    return scales
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Benchmark ALS training and top-K scoring")
+    parser.add_argument("--scales", type=parse_scales, default=parse_scales("10000x1000,100000x10000"),
+                        help="Comma-separated USERSxPRODUCTS scale points")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rank", type=int, default=10)
+    parser.add_argument("--max-iter", type=int, default=10)
+    parser.add_argument("--block-size", type=int, default=4096)
+    parser.add_argument("--output", default="als_benchmark.json", help="JSON results path")
+    args = parser.parse_args()
+
+    spark = create_spark_session("ALS-Benchmark")
+
+    try:
+        results = []
+        for num_users, num_items in args.scales:
+            print(f"\n⏱️  Benchmarking {num_users:,} users x {num_items:,} products...")
+            results.append(run_benchmark(spark, num_users, num_items, k=args.k, rank=args.rank,
+                                         max_iter=args.max_iter, block_size=args.block_size))
+
+        print("\n📊 ALS Benchmark Results:")
+        print("=" * 80)
+        print(f"{'users':>12}{'products':>12}{'interactions':>15}{'train(s)':>12}{'score(s)':>12}")
+        print("-" * 80)
+        for result in results:
+            print(f"{result['users']:>12,}{result['products']:>12,}{result['interactions']:>15,}"
+                  f"{result['train_seconds']:>12.2f}{result['score_seconds']:>12.2f}")
+        print("=" * 80)
+
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results written to {args.output}")
+
+    finally:
+        spark.stop()
+
+
+if __name__ == "__main__":
+    main()
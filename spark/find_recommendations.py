@@ -10,10 +10,61 @@ This job demonstrates:
 """
 
 from pyspark.sql import SparkSession
-from pyspark.sql.functions import col, count, desc, avg, sum as spark_sum
+from pyspark.sql.functions import (
+    col, count, desc, avg, sum as spark_sum, broadcast, format_string, array, lit, element_at,
+    when, posexplode, collect_list, struct, array_sort, concat_ws, expr
+)
+from pyspark.ml.feature import StringIndexer
+from pyspark.ml.recommendation import ALS
+from pyspark.sql.types import (
+    StructType, StructField, IntegerType, LongType, StringType, DoubleType, TimestampType
+)
+import argparse
 import sys
 import time
-from hbase_connector import dataframe_to_hbase, HBaseConnector
+from hbase_connector import (
+    dataframe_to_hbase, dataframe_to_hbase_snapshot, snapshot_row_prefix, HBaseConnector, HBaseMetrics
+)
+from job_metrics import JobMetrics, track
+
+# Action names in action_code order (mirrors ACTIONS in data/generate_clickstream.py)
+ACTIONS = ['view', 'click', 'add_to_cart', 'purchase']
+ACTION_CODES = {action: code for code, action in enumerate(ACTIONS)}
+
+# Implicit-feedback strength of each action for personalized recommendations
+ACTION_STRENGTH = {'view': 1.0, 'click': 3.0, 'add_to_cart': 5.0, 'purchase': 10.0}
+
+# Output columns of product-level results
+PRODUCT_COLUMNS = ['product_id', 'product_name', 'category', 'total_interactions',
+                   'purchases', 'clicks', 'views', 'avg_price', 'hot_score']
+
+# Schemas of the denormalized and compact event formats and the product catalog dimension
+CLICKSTREAM_SCHEMA = StructType([
+    StructField("timestamp", TimestampType()),
+    StructField("user_id", StringType()),
+    StructField("session_id", StringType()),
+    StructField("product_id", StringType()),
+    StructField("product_name", StringType()),
+    StructField("category", StringType()),
+    StructField("action", StringType()),
+    StructField("price", DoubleType()),
+])
+
+COMPACT_EVENT_SCHEMA = StructType([
+    StructField("ts", LongType()),
+    StructField("user_code", IntegerType()),
+    StructField("session_code", IntegerType()),
+    StructField("product_code", IntegerType()),
+    StructField("action_code", IntegerType()),
+])
+
+CATALOG_SCHEMA = StructType([
+    StructField("product_code", IntegerType()),
+    StructField("product_id", StringType()),
+    StructField("product_name", StringType()),
+    StructField("category", StringType()),
+    StructField("price", DoubleType()),
+])
 
 
 def create_spark_session(app_name="Amazon-Recommendations"):
@@ -32,17 +83,28 @@ def create_spark_session(app_name="Amazon-Recommendations"):
     return spark
 
 
-def read_clickstream_from_hdfs(spark, hdfs_path="hdfs://namenode:9000/data/clickstream_large.txt"):
-    """Read clickstream data from HDFS"""
+def read_clickstream_from_hdfs(spark, hdfs_path="hdfs://namenode:9000/data/clickstream_large.txt",
+                               schema=None, cache=False):
+    """
+    Read clickstream data from HDFS
+
+    Args:
+        spark: Active SparkSession
+        hdfs_path: Clickstream input path
+        schema: Explicit schema (e.g. CLICKSTREAM_SCHEMA); infers it with an extra pass when None
+        cache: Cache the DataFrame before counting, so the count materializes the cache
+    """
     print(f"\n📖 Reading data from HDFS: {hdfs_path}")
 
     start_time = time.time()
 
-    df = spark.read.csv(
-        hdfs_path,
-        header=True,
-        inferSchema=True
-    )
+    if schema is None:
+        df = spark.read.csv(hdfs_path, header=True, inferSchema=True)
+    else:
+        df = spark.read.csv(hdfs_path, header=True, schema=schema)
+
+    if cache:
+        df = df.cache()
 
     record_count = df.count()
     elapsed_time = time.time() - start_time
@@ -54,29 +116,107 @@ def read_clickstream_from_hdfs(spark, hdfs_path="hdfs://namenode:9000/data/click
     return df
 
 
-def analyze_top_products(df):
-    """Analyze clickstream to find top products"""
-    print("\n🔍 Analyzing top products...")
+def read_compact_clickstream(spark, events_path, catalog_path, cache=False, catalog=None):
+    """
+    Read integer-coded clickstream events and the product catalog dimension
+
+    Both files are produced by `generate_clickstream.py --format compact`.
+    Explicit schemas avoid the extra inferSchema pass over the events.
+    With cache=True the events are cached before counting, so the count
+    materializes the cache.
+
+    Args:
+        spark: Active SparkSession
+        events_path: Compact events path
+        catalog_path: Product catalog path
+        cache: Cache the events DataFrame
+        catalog: Already loaded catalog DataFrame; it is reused and
+            `catalog_path` is not read again
+
+    Returns:
+        Tuple of (events DataFrame, catalog DataFrame)
+    """
+    print(f"\n📖 Reading compact events from HDFS: {events_path}")
+
+    start_time = time.time()
+
+    events = spark.read.csv(events_path, header=True, schema=COMPACT_EVENT_SCHEMA)
+    if cache:
+        events = events.cache()
+    record_count = events.count()
+
+    if catalog is None:
+        print(f"📖 Reading product catalog: {catalog_path}")
+        catalog = spark.read.csv(catalog_path, header=True, schema=CATALOG_SCHEMA).cache()
+        print(f"✅ Read {catalog.count():,} catalog products")
+
+    elapsed_time = time.time() - start_time
+
+    print(f"✅ Read {record_count:,} events in {elapsed_time:.2f} seconds")
+    print(f"📊 Schema:")
+    events.printSchema()
+
+    return events, catalog
+
+
+def _action_is(df, action):
+    """Boolean column: event action equals `action` (denormalized or compact events)"""
+    if "action" in df.columns:
+        return col("action") == action
+    return col("action_code") == ACTION_CODES[action]
+
+
+def with_product_details(product_stats, catalog):
+    """
+    Broadcast-join catalog details onto code-level product stats
+
+    The catalog is only joined after aggregation, so the shuffle carries
+    integer codes instead of product names and categories.
+    """
+    return product_stats \
+        .join(broadcast(catalog), "product_code") \
+        .select(*[col("price").alias("avg_price") if name == "avg_price" else col(name)
+                  for name in PRODUCT_COLUMNS])
+
+
+def compute_product_stats(df, catalog=None):
+    """
+    Aggregate per-product metrics and the weighted hot score
+
+    With compact events (`catalog` given) the result is keyed by product_code
+    only; use with_product_details() to attach names for output rows.
+    """
+    metrics = [
+        count("*").alias("total_interactions"),
+        spark_sum(_action_is(df, "purchase").cast("int")).alias("purchases"),
+        spark_sum(_action_is(df, "click").cast("int")).alias("clicks"),
+        spark_sum(_action_is(df, "view").cast("int")).alias("views"),
+    ]
 
     # Calculate metrics per product
-    product_stats = df.groupBy("product_id", "product_name", "category") \
-        .agg(
-            count("*").alias("total_interactions"),
-            spark_sum((col("action") == "purchase").cast("int")).alias("purchases"),
-            spark_sum((col("action") == "click").cast("int")).alias("clicks"),
-            spark_sum((col("action") == "view").cast("int")).alias("views"),
-            avg("price").alias("avg_price")
-        ) \
-        .orderBy(desc("total_interactions"))
+    if catalog is None:
+        product_stats = df.groupBy("product_id", "product_name", "category") \
+            .agg(*metrics, avg("price").alias("avg_price"))
+    else:
+        product_stats = df.groupBy("product_code").agg(*metrics)
 
     # Calculate hot score (weighted: purchase=10, click=3, view=1)
-    product_stats = product_stats.withColumn(
+    return product_stats.withColumn(
         "hot_score",
         (col("purchases") * 10) + (col("clicks") * 3) + col("views")
     )
 
+
+def analyze_top_products(df, catalog=None):
+    """Analyze clickstream to find top products"""
+    print("\n🔍 Analyzing top products...")
+
+    product_stats = compute_product_stats(df, catalog)
+
     # Get top 10
     top_products = product_stats.orderBy(desc("hot_score")).limit(10)
+    if catalog is not None:
+        top_products = with_product_details(top_products, catalog).orderBy(desc("hot_score"))
 
     print("\n🏆 Top 10 Hot Products:")
     print("=" * 100)
@@ -85,17 +225,57 @@ def analyze_top_products(df):
     return top_products
 
 
-def analyze_top_categories(df):
+def top_products_for_category(df, category, n=10, catalog=None):
+    """
+    Find the top N products of a single category by hot score
+
+    Args:
+        df: Clickstream DataFrame
+        category: Category name (e.g. 'Electronics')
+        n: Number of products to return
+        catalog: Product catalog, required for compact events
+    """
+    print(f"\n🔍 Analyzing top {n} products in '{category}'...")
+
+    if catalog is None:
+        return compute_product_stats(df.filter(col("category") == category)) \
+            .orderBy(desc("hot_score")) \
+            .limit(n)
+
+    category_codes = catalog.filter(col("category") == category).select("product_code")
+    top_codes = compute_product_stats(df.join(broadcast(category_codes), "product_code", "left_semi"), catalog) \
+        .orderBy(desc("hot_score")) \
+        .limit(n)
+    return with_product_details(top_codes, catalog).orderBy(desc("hot_score"))
+
+
+def analyze_top_categories(df, catalog=None):
     """Analyze top categories by sales"""
     print("\n📊 Analyzing top categories...")
 
-    category_stats = df.groupBy("category") \
-        .agg(
-            count("*").alias("total_interactions"),
-            spark_sum((col("action") == "purchase").cast("int")).alias("purchases"),
-            avg("price").alias("avg_price")
-        ) \
-        .orderBy(desc("purchases"))
+    if catalog is None:
+        category_stats = df.groupBy("category") \
+            .agg(
+                count("*").alias("total_interactions"),
+                spark_sum(_action_is(df, "purchase").cast("int")).alias("purchases"),
+                avg("price").alias("avg_price")
+            )
+    else:
+        # Aggregate on product codes first, then roll the small result up to categories
+        category_stats = df.groupBy("product_code") \
+            .agg(
+                count("*").alias("interactions"),
+                spark_sum(_action_is(df, "purchase").cast("int")).alias("purchases")
+            ) \
+            .join(broadcast(catalog), "product_code") \
+            .groupBy("category") \
+            .agg(
+                spark_sum("interactions").alias("total_interactions"),
+                spark_sum("purchases").alias("purchases"),
+                (spark_sum(col("price") * col("interactions")) / spark_sum("interactions")).alias("avg_price")
+            )
+
+    category_stats = category_stats.orderBy(desc("purchases"))
 
     print("\n🏷️  Category Performance:")
     print("=" * 80)
@@ -104,25 +284,39 @@ def analyze_top_categories(df):
     return category_stats
 
 
-def analyze_user_behavior(df):
+def analyze_user_behavior(df, catalog=None):
     """Analyze user behavior patterns"""
     print("\n👥 Analyzing user behavior...")
 
-    user_stats = df.groupBy("user_id") \
+    user_key = "user_id" if catalog is None else "user_code"
+    action_key = "action" if catalog is None else "action_code"
+
+    user_stats = df.groupBy(user_key) \
         .agg(
             count("*").alias("total_actions"),
-            spark_sum((col("action") == "purchase").cast("int")).alias("purchases"),
-            spark_sum((col("action") == "view").cast("int")).alias("views")
+            spark_sum(_action_is(df, "purchase").cast("int")).alias("purchases"),
+            spark_sum(_action_is(df, "view").cast("int")).alias("views")
         ) \
         .orderBy(desc("purchases"))
 
+    # Calculate conversion metrics
+    action_distribution = df.groupBy(action_key).count().orderBy(desc("count"))
+
+    if catalog is not None:
+        # Decode ids only on the aggregated rows
+        user_stats = user_stats.select(
+            format_string("user_%04d", col("user_code")).alias("user_id"),
+            "total_actions", "purchases", "views"
+        )
+        action_names = array(*[lit(action) for action in ACTIONS])
+        action_distribution = action_distribution.select(
+            element_at(action_names, col("action_code") + 1).alias("action"), "count"
+        )
+
     print("\n👤 Top 10 Buyers:")
     print("=" * 60)
     user_stats.show(10, truncate=False)
 
-    # Calculate conversion metrics
-    action_distribution = df.groupBy("action").count().orderBy(desc("count"))
-
     print("\n📈 Action Distribution:")
     print("=" * 40)
     action_distribution.show(truncate=False)
@@ -130,8 +324,199 @@ def analyze_user_behavior(df):
     return user_stats, action_distribution
 
 
+def build_interactions(df, catalog=None):
+    """
+    Aggregate user x product implicit-feedback strength for ALS
+
+    ALS needs integer ids. Compact events already carry user_code/product_code;
+    denormalized events are indexed with StringIndexer.
+
+    Returns:
+        Tuple of (interactions DataFrame [user_idx, item_idx, strength],
+                  users DataFrame [user_idx, user_id],
+                  items DataFrame [item_idx, product_id])
+    """
+    strength = None
+    for action, weight in ACTION_STRENGTH.items():
+        strength = when(_action_is(df, action), weight) if strength is None \
+            else strength.when(_action_is(df, action), weight)
+    strength = strength.otherwise(0.0)
+
+    if catalog is not None:
+        events = df.select(col("user_code").alias("user_idx"),
+                           col("product_code").alias("item_idx"),
+                           strength.alias("weight"))
+        users = events.select("user_idx").distinct() \
+            .withColumn("user_id", format_string("user_%04d", col("user_idx")))
+        items = catalog.select(col("product_code").alias("item_idx"), "product_id")
+    else:
+        user_indexer = StringIndexer(inputCol="user_id", outputCol="user_index").fit(df)
+        item_indexer = StringIndexer(inputCol="product_id", outputCol="item_index").fit(df)
+
+        events = item_indexer.transform(user_indexer.transform(df)).select(
+            col("user_index").cast("int").alias("user_idx"),
+            col("item_index").cast("int").alias("item_idx"),
+            strength.alias("weight")
+        )
+        # Derive the id mappings on the cluster instead of shipping the label lists
+        users = user_indexer.transform(df.select("user_id").distinct()) \
+            .select(col("user_index").cast("int").alias("user_idx"), "user_id")
+        items = item_indexer.transform(df.select("product_id").distinct()) \
+            .select(col("item_index").cast("int").alias("item_idx"), "product_id")
+
+    interactions = events.groupBy("user_idx", "item_idx").agg(spark_sum("weight").alias("strength"))
+    return interactions, users, items
+
+
+def train_als(interactions, rank=10, max_iter=10, reg_param=0.1, alpha=1.0, block_size=4096, seed=42):
+    """
+    Train an implicit-feedback ALS model
+
+    Args:
+        interactions: DataFrame [user_idx, item_idx, strength]
+        rank: Number of latent factors
+        max_iter: ALS iterations
+        reg_param: Regularization
+        alpha: Confidence scaling of the implicit strength
+        block_size: Users/items per block when scoring (blocked GEMM in recommendForAll*)
+        seed: Random seed
+    """
+    als = ALS(
+        userCol="user_idx",
+        itemCol="item_idx",
+        ratingCol="strength",
+        implicitPrefs=True,
+        rank=rank,
+        maxIter=max_iter,
+        regParam=reg_param,
+        alpha=alpha,
+        blockSize=block_size,
+        coldStartStrategy="drop",
+        seed=seed
+    )
+    return als.fit(interactions)
+
+
+def recommend_top_k(model, users, items, k=10):
+    """
+    Score all users and keep the top K products per user
+
+    recommendForAllUsers() multiplies blocks of user factors with blocks of item
+    factors and keeps a bounded top-K per user, so no user x item cross join is
+    materialized.
+
+    Returns:
+        DataFrame with one row per user: user_id, recommendations, scores, k
+    """
+    recommendations = model.recommendForAllUsers(k) \
+        .select("user_idx", posexplode("recommendations").alias("rank", "rec")) \
+        .select("user_idx", "rank", col("rec.item_idx").alias("item_idx"), col("rec.rating").alias("score")) \
+        .join(items, "item_idx")
+
+    return recommendations \
+        .groupBy("user_idx") \
+        .agg(array_sort(collect_list(struct("rank", "product_id", "score"))).alias("recs")) \
+        .join(users, "user_idx") \
+        .select(
+            "user_id",
+            concat_ws(",", col("recs.product_id")).alias("recommendations"),
+            concat_ws(",", expr("transform(recs, r -> cast(round(r.score, 4) as string))")).alias("scores"),
+            lit(k).alias("k")
+        )
+
+
+def analyze_personalized_recommendations(df, catalog=None, k=10, rank=10, max_iter=10,
+                                         reg_param=0.1, alpha=1.0):
+    """Train ALS on the clickstream and produce top-K products per user"""
+    print("\n🧠 Training personalized recommendations (implicit ALS)...")
+
+    interactions, users, items = build_interactions(df, catalog)
+    interactions = interactions.cache()
+    print(f"   Interactions: {interactions.count():,} user x product pairs")
+
+    start_time = time.time()
+    model = train_als(interactions, rank=rank, max_iter=max_iter, reg_param=reg_param, alpha=alpha)
+    train_time = time.time() - start_time
+
+    start_time = time.time()
+    user_recs = recommend_top_k(model, users, items, k).cache()
+    user_count = user_recs.count()
+    score_time = time.time() - start_time
+
+    interactions.unpersist()
+
+    print(f"✅ Trained in {train_time:.2f}s, scored {user_count:,} users in {score_time:.2f}s")
+    print(f"\n🎁 Sample Personalized Recommendations (top {k}):")
+    print("=" * 100)
+    user_recs.show(10, truncate=80)
+
+    return user_recs
+
+
+def save_user_recommendations_to_hbase(user_recs, hbase_host='hbase', hbase_port=9090,
+                                       table_name='user_recommendations', write_mode='full',
+                                       snapshot_keep=2, retries=0):
+    """
+    Save personalized recommendations to HBase, one row per user
+
+    Row key: user_id (prefixed with the version in 'snapshot' mode);
+    columns info:recommendations, info:scores, info:k. If the HBase write fails,
+    the recommendations are saved as JSON to HDFS instead.
+
+    Returns:
+        HBaseMetrics of the table setup and the write
+    """
+    print(f"\n💾 Saving personalized recommendations to HBase table '{table_name}'...")
+
+    # Ensure table exists
+    connector = HBaseConnector(host=hbase_host, port=hbase_port, table_name=table_name)
+    try:
+        connector.create_table_if_not_exists(column_families=['info'])
+    except Exception as e:
+        print(f"⚠️  Warning: Could not verify/create table: {str(e)}")
+        print("   Continuing with write attempt...")
+
+    try:
+        if write_mode == 'snapshot':
+            version, write_metrics = dataframe_to_hbase_snapshot(
+                user_recs,
+                table_name=table_name,
+                row_key_field='user_id',
+                hbase_host=hbase_host,
+                hbase_port=hbase_port,
+                retries=retries,
+                keep=snapshot_keep
+            )
+            print(f"📌 Published snapshot '{version}'")
+        else:
+            write_metrics = dataframe_to_hbase(
+                user_recs,
+                table_name=table_name,
+                row_key_field='user_id',
+                hbase_host=hbase_host,
+                hbase_port=hbase_port,
+                retries=retries,
+                skip_unchanged=(write_mode == 'diff')
+            )
+        connector.metrics.merge(write_metrics)
+
+        print(f"✅ Wrote {write_metrics.counters.get('rows_written', 0):,} user rows to HBase")
+
+    except Exception as e:
+        print(f"❌ Error writing to HBase: {str(e)}")
+        print("   Falling back to file-based storage...")
+
+        output_path = "/data/recommendations_output/user_recommendations_json"
+        user_recs.write.mode("overwrite").json(output_path)
+        print(f"✅ Backup saved to {output_path}")
+
+    return connector.metrics
+
+
 def save_to_hbase(top_products, hbase_host='hbase', hbase_port=9090,
-                  table_name='recommendations', save_backup=True):
+                  table_name='recommendations', save_backup=True, metrics=None,
+                  write_mode='full', delete_missing=False,
+                  snapshot_keep=2, retries=0):
     """
     Save recommendations to HBase for real-time serving
 
@@ -141,6 +526,16 @@ def save_to_hbase(top_products, hbase_host='hbase', hbase_port=9090,
         hbase_port: HBase Thrift server port
         table_name: HBase table name
         save_backup: Whether to save backup files to HDFS
+        metrics: Optional JobMetrics collector; each sink is recorded as a step
+        write_mode: 'full' rewrites every row, 'diff' only writes rows whose
+            content fingerprint changed since the last diff write, 'snapshot'
+            writes a new version and atomically flips the pointer row to it
+        delete_missing: In 'diff' mode, delete rows that are no longer in the output
+        snapshot_keep: In 'snapshot' mode, number of most recent versions to retain
+        retries: Number of times a failed HBase batch (including its connect) is resent
+
+    Returns:
+        HBaseMetrics of the table setup and the write
     """
     print(f"\n💾 Saving recommendations to HBase table '{table_name}'...")
 
@@ -152,8 +547,8 @@ def save_to_hbase(top_products, hbase_host='hbase', hbase_port=9090,
     top_10.show(truncate=False)
 
     # Ensure table exists
+    connector = HBaseConnector(host=hbase_host, port=hbase_port, table_name=table_name)
     try:
-        connector = HBaseConnector(host=hbase_host, port=hbase_port, table_name=table_name)
         connector.create_table_if_not_exists(column_families=['info'])
         print(f"✅ HBase table '{table_name}' is ready")
     except Exception as e:
@@ -161,18 +556,41 @@ def save_to_hbase(top_products, hbase_host='hbase', hbase_port=9090,
         print("   Continuing with write attempt...")
 
     # Write DataFrame to HBase
+    row_key_prefix = ''
     try:
         print(f"\n📤 Writing {top_products.count()} products to HBase...")
 
-        dataframe_to_hbase(
-            top_products,
-            table_name=table_name,
-            row_key_field='product_id',
-            hbase_host=hbase_host,
-            hbase_port=hbase_port
-        )
+        with track(metrics, "sink:hbase"):
+            if write_mode == 'snapshot':
+                version, write_metrics = dataframe_to_hbase_snapshot(
+                    top_products,
+                    table_name=table_name,
+                    row_key_field='product_id',
+                    hbase_host=hbase_host,
+                    hbase_port=hbase_port,
+                    retries=retries,
+                    keep=snapshot_keep
+                )
+                row_key_prefix = snapshot_row_prefix(version)
+                print(f"📌 Published snapshot '{version}'")
+            else:
+                write_metrics = dataframe_to_hbase(
+                    top_products,
+                    table_name=table_name,
+                    row_key_field='product_id',
+                    hbase_host=hbase_host,
+                    hbase_port=hbase_port,
+                    retries=retries,
+                    skip_unchanged=(write_mode == 'diff'),
+                    delete_missing=delete_missing
+                )
+        connector.metrics.merge(write_metrics)
 
         print(f"✅ Successfully wrote recommendations to HBase!")
+        if write_mode == 'diff':
+            print(f"   Written: {write_metrics.counters.get('rows_written', 0)}, "
+                  f"skipped (unchanged): {write_metrics.counters.get('rows_unchanged', 0)}, "
+                  f"deleted: {write_metrics.counters.get('rows_deleted', 0)}")
 
     except Exception as e:
         print(f"❌ Error writing to HBase: {str(e)}")
@@ -184,14 +602,16 @@ def save_to_hbase(top_products, hbase_host='hbase', hbase_port=9090,
         print(f"\n💾 Saving backup to HDFS...")
         output_path = "/data/recommendations_output"
 
-        top_products.coalesce(1).write.mode("overwrite").csv(
-            output_path + "/recommendations_csv",
-            header=True
-        )
+        with track(metrics, "sink:backup_csv"):
+            top_products.coalesce(1).write.mode("overwrite").csv(
+                output_path + "/recommendations_csv",
+                header=True
+            )
 
-        top_products.coalesce(1).write.mode("overwrite").json(
-            output_path + "/recommendations_json"
-        )
+        with track(metrics, "sink:backup_json"):
+            top_products.coalesce(1).write.mode("overwrite").json(
+                output_path + "/recommendations_json"
+            )
 
         print(f"✅ Backup saved to {output_path}")
 
@@ -204,7 +624,7 @@ def save_to_hbase(top_products, hbase_host='hbase', hbase_port=9090,
     print("-" * 80)
 
     for idx, row in enumerate(recommendations[:5], 1):
-        print(f"  Row Key: {row['product_id']}")
+        print(f"  Row Key: {row_key_prefix}{row['product_id']}")
         print(f"    info:product_name     => {row['product_name']}")
         print(f"    info:category         => {row['category']}")
         print(f"    info:hot_score        => {row['hot_score']}")
@@ -212,6 +632,53 @@ def save_to_hbase(top_products, hbase_host='hbase', hbase_port=9090,
         print(f"    info:total_interactions => {row['total_interactions']}")
         print()
 
+    return connector.metrics
+
+
+def non_negative_int(value):
+    """argparse type for counts that may be zero but not negative"""
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must be >= 0, got {number}")
+    return number
+
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Amazon product recommendations Spark job")
+    parser.add_argument("hdfs_path", nargs="?",
+                        default="hdfs://localhost:9000/big-data-demo/clickstream_large.txt",
+                        help="Clickstream input path")
+    parser.add_argument("--catalog",
+                        help="Product catalog path; treats the input as compact integer-coded events")
+    parser.add_argument("--metrics-report", default="run_report.json",
+                        help="Local path for the JSON run report (empty to disable)")
+    parser.add_argument("--verbose-metrics", action="store_true",
+                        help="Print per-stage details in the metrics summary")
+    parser.add_argument("--hbase-metrics", default="hbase_metrics.prom",
+                        help="HBase connector metrics export (.prom or .json, empty to disable)")
+    parser.add_argument("--hbase-retries", type=non_negative_int, default=2,
+                        help="Times a failed HBase batch write (including its connect) is retried, "
+                             "with exponential backoff")
+    parser.add_argument("--write-mode", choices=["full", "diff", "snapshot"], default="full",
+                        help="'diff' skips HBase rows whose content has not changed; "
+                             "'snapshot' writes a new version and atomically publishes it")
+    parser.add_argument("--delete-missing", action="store_true",
+                        help="In diff mode, delete HBase rows no longer present in the output")
+    parser.add_argument("--snapshot-keep", type=int, default=2,
+                        help="In snapshot mode, number of most recent versions to retain")
+    parser.add_argument("--personalized", action="store_true",
+                        help="Also train implicit ALS and write top-K products per user")
+    parser.add_argument("--top-k", type=int, default=10, help="Products per user")
+    parser.add_argument("--als-rank", type=int, default=10, help="ALS latent factors")
+    parser.add_argument("--als-max-iter", type=int, default=10, help="ALS iterations")
+    parser.add_argument("--als-reg", type=float, default=0.1, help="ALS regularization")
+    parser.add_argument("--als-alpha", type=float, default=1.0, help="ALS implicit confidence scaling")
+    args = parser.parse_args(argv)
+    if args.delete_missing and args.write_mode != "diff":
+        parser.error("--delete-missing requires --write-mode diff")
+    return args
+
 
 def main():
     """Main execution function"""
@@ -221,27 +688,54 @@ def main():
 
     start_time = time.time()
 
-    # Get HDFS path from argument or use default
-    hdfs_path = sys.argv[1] if len(sys.argv) > 1 else "hdfs://localhost:9000/big-data-demo/clickstream_large.txt"
+    args = parse_args()
 
     # Step 1: Create Spark Session
     spark = create_spark_session()
+    metrics = JobMetrics(spark, verbose=args.verbose_metrics)
+    hbase_metrics = HBaseMetrics()
 
     try:
         # Step 2: Read data from HDFS
-        df = read_clickstream_from_hdfs(spark, hdfs_path)
+        with metrics.step("read"):
+            if args.catalog:
+                df, catalog = read_compact_clickstream(spark, args.hdfs_path, args.catalog)
+            else:
+                df, catalog = read_clickstream_from_hdfs(spark, args.hdfs_path), None
 
         # Step 3: Analyze top products
-        top_products = analyze_top_products(df)
+        with metrics.step("analyze_top_products"):
+            top_products = analyze_top_products(df, catalog)
 
         # Step 4: Analyze categories
-        top_categories = analyze_top_categories(df)
+        with metrics.step("analyze_top_categories"):
+            top_categories = analyze_top_categories(df, catalog)
 
         # Step 5: Analyze user behavior
-        user_stats, action_dist = analyze_user_behavior(df)
+        with metrics.step("analyze_user_behavior"):
+            user_stats, action_dist = analyze_user_behavior(df, catalog)
 
         # Step 6: Save results to HBase
-        save_to_hbase(top_products, hbase_host='localhost', hbase_port=9090)
+        with metrics.step("save_to_hbase"):
+            hbase_metrics.merge(save_to_hbase(
+                top_products, hbase_host='localhost', hbase_port=9090, metrics=metrics,
+                write_mode=args.write_mode, delete_missing=args.delete_missing,
+                snapshot_keep=args.snapshot_keep, retries=args.hbase_retries
+            ))
+
+        # Step 7: Personalized recommendations per user
+        if args.personalized:
+            with metrics.step("analyze_personalized"):
+                user_recs = analyze_personalized_recommendations(
+                    df, catalog, k=args.top_k, rank=args.als_rank, max_iter=args.als_max_iter,
+                    reg_param=args.als_reg, alpha=args.als_alpha
+                )
+
+            with metrics.step("sink:user_recommendations"):
+                hbase_metrics.merge(save_user_recommendations_to_hbase(
+                    user_recs, hbase_host='localhost', hbase_port=9090, write_mode=args.write_mode,
+                    snapshot_keep=args.snapshot_keep, retries=args.hbase_retries
+                ))
 
         # Summary
         total_time = time.time() - start_time
@@ -262,8 +756,18 @@ def main():
         sys.exit(1)
 
     finally:
-        spark.stop()
-        print("\n👋 Spark Session closed")
+        # A failed export must neither skip spark.stop() nor mask the job's outcome
+        try:
+            metrics.print_summary()
+            if args.metrics_report:
+                metrics.write_report(args.metrics_report)
+            if args.hbase_metrics:
+                hbase_metrics.write(args.hbase_metrics)
+        except Exception as e:
+            print(f"⚠️  Warning: Could not export metrics: {str(e)}")
+        finally:
+            spark.stop()
+            print("\n👋 Spark Session closed")
 
 
 if __name__ == "__main__":
@@ -6,19 +6,244 @@ Provides utilities to write Spark DataFrames to HBase using Thrift
 
 import happybase
 from typing import Iterator, Dict, List
+import hashlib
+import json
 import logging
+import time
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Latency histogram bucket upper bounds (milliseconds)
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Delay before the first batch retry; doubled on every further attempt (seconds)
+RETRY_BACKOFF_SECONDS = 0.5
+
+# Hot-path debug lines (connect, batch sent) are only logged once every N events
+LOG_SAMPLE_EVERY = 100
+
+_log_sample_counts = {}
+
+# Column qualifier holding the content fingerprint written by diff-aware writes
+FINGERPRINT_COLUMN = '_fp'
+
+# Pointer row of snapshot mode: info:current names the published version and one
+# info:v_<version> column per published version records its row count. A version is
+# marked info:pending_<version> before its rows are written, so the rows of a run
+# that fails before publishing can still be garbage-collected. The row key sorts
+# before all data rows and is updated with a single (atomic) row put.
+SNAPSHOT_POINTER_ROW = b'!snapshot'
+SNAPSHOT_KEY_SEPARATOR = '#'
+
+# A pending snapshot older than this is treated as abandoned by a failed run and
+# garbage-collected; it must exceed the longest expected snapshot write
+SNAPSHOT_PENDING_LEASE_SECONDS = 24 * 3600
+
+# Rows per Thrift call when deleting in bulk
+DELETE_BATCH_SIZE = 1000
+
+
+def new_snapshot_version():
+    """
+    Return a new, lexicographically increasing snapshot version
+
+    Versions are millisecond timestamps, zero-padded so string order matches
+    time order (e.g. 'v1729331820123').
+    """
+    return f"v{int(time.time() * 1000):013d}"
+
+
+def snapshot_age_seconds(version):
+    """Seconds since snapshot `version` was created"""
+    return time.time() - int(version[1:]) / 1000
+
+
+def snapshot_row_prefix(version):
+    """Row key prefix of all rows of snapshot `version`"""
+    return f"{version}{SNAPSHOT_KEY_SEPARATOR}"
+
+
+def row_fingerprint(columns):
+    """
+    Compact content fingerprint of an encoded HBase row
+
+    Args:
+        columns: Dict of encoded column name -> encoded value
+
+    Returns:
+        16 hex characters (64-bit BLAKE2b digest) as bytes
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for col_name, col_value in sorted(columns.items()):
+        digest.update(col_name)
+        digest.update(b'\x00')
+        digest.update(col_value)
+        digest.update(b'\x00')
+    return digest.hexdigest().encode()
+
+
+def _sampled_debug(event, message):
+    """Log `message` at debug level for the first and every LOG_SAMPLE_EVERY-th `event`"""
+    seen = _log_sample_counts.get(event, 0)
+    _log_sample_counts[event] = seen + 1
+    if seen % LOG_SAMPLE_EVERY == 0 and logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"{message} (sampled 1/{LOG_SAMPLE_EVERY}, seen {seen + 1})")
+
+
+class HBaseMetrics:
+    """
+    Counters and latency histograms for HBase operations
+
+    Instances are mergeable so executor-side metrics can be aggregated on the
+    driver through a Spark accumulator (see HBaseMetricsAccumulatorParam).
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+
+    def inc(self, name, value=1):
+        """Increment counter `name` by `value`"""
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, value_ms):
+        """Record a latency sample (milliseconds) in histogram `name`"""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = {'buckets': [0] * (len(LATENCY_BUCKETS_MS) + 1), 'sum': 0.0, 'count': 0}
+            self.histograms[name] = histogram
+
+        index = len(LATENCY_BUCKETS_MS)
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if value_ms <= bound:
+                index = i
+                break
+
+        histogram['buckets'][index] += 1
+        histogram['sum'] += value_ms
+        histogram['count'] += 1
+
+    def merge(self, other):
+        """Add all counters and histograms of `other` into this instance"""
+        for name, value in other.counters.items():
+            self.inc(name, value)
+
+        for name, histogram in other.histograms.items():
+            target = self.histograms.setdefault(
+                name, {'buckets': [0] * (len(LATENCY_BUCKETS_MS) + 1), 'sum': 0.0, 'count': 0}
+            )
+            target['buckets'] = [a + b for a, b in zip(target['buckets'], histogram['buckets'])]
+            target['sum'] += histogram['sum']
+            target['count'] += histogram['count']
+
+        return self
+
+    def snapshot(self):
+        """
+        Return a JSON-serializable snapshot
+
+        Includes derived scan throughput and mean latency per histogram.
+        """
+        scan_seconds = self.counters.get('scan_seconds', 0)
+        return {
+            'counters': dict(self.counters),
+            'scan_rows_per_second': (
+                round(self.counters.get('rows_read', 0) / scan_seconds, 1) if scan_seconds else 0.0
+            ),
+            'histograms': {
+                name: {
+                    'buckets_ms': list(LATENCY_BUCKETS_MS) + ['+Inf'],
+                    'counts': histogram['buckets'],
+                    'sum_ms': round(histogram['sum'], 3),
+                    'count': histogram['count'],
+                    'mean_ms': round(histogram['sum'] / histogram['count'], 3) if histogram['count'] else 0.0,
+                }
+                for name, histogram in self.histograms.items()
+            },
+        }
+
+    def to_prometheus(self, prefix='hbase_connector'):
+        """
+        Render metrics in the Prometheus text exposition format
+
+        Args:
+            prefix: Metric name prefix
+        """
+        lines = []
+
+        for name in sorted(self.counters):
+            metric = f"{prefix}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {self.counters[name]}")
+
+        snapshot = self.snapshot()
+        lines.append(f"# TYPE {prefix}_scan_rows_per_second gauge")
+        lines.append(f"{prefix}_scan_rows_per_second {snapshot['scan_rows_per_second']}")
+
+        for name in sorted(self.histograms):
+            histogram = self.histograms[name]
+            metric = f"{prefix}_{name}"
+            lines.append(f"# TYPE {metric} histogram")
+
+            cumulative = 0
+            for bound, bucket_count in zip(list(LATENCY_BUCKETS_MS) + ['+Inf'], histogram['buckets']):
+                cumulative += bucket_count
+                lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+
+            lines.append(f"{metric}_sum {histogram['sum']:.3f}")
+            lines.append(f"{metric}_count {histogram['count']}")
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """
+        Export metrics to `path`
+
+        Files ending in `.prom` are written in Prometheus text format,
+        anything else as a JSON snapshot.
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            if path.endswith('.prom'):
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.snapshot(), f, indent=2)
+
+        logger.info(f"📈 HBase metrics written to {path}")
+
+
+class HBaseMetricsAccumulatorParam:
+    """
+    Spark AccumulatorParam that merges HBaseMetrics from executors
+    """
+
+    def zero(self, value):
+        return HBaseMetrics()
+
+    def addInPlace(self, value1, value2):
+        return value1.merge(value2)
+
+
+class KeySetAccumulatorParam:
+    """
+    Spark AccumulatorParam that unions sets of row keys from executors
+    """
+
+    def zero(self, value):
+        return set()
+
+    def addInPlace(self, value1, value2):
+        value1 |= value2
+        return value1
+
 
 class HBaseConnector:
     """
     Wrapper class for HBase operations via Thrift
     """
 
-    def __init__(self, host='hbase', port=9090, table_name='recommendations'):
+    def __init__(self, host='hbase', port=9090, table_name='recommendations', metrics=None):
         """
         Initialize HBase connection parameters
 
@@ -26,10 +251,13 @@ class HBaseConnector:
             host: HBase Thrift server hostname
             port: HBase Thrift server port (default 9090)
             table_name: Target HBase table name
+            metrics: HBaseMetrics instance to record into (a new one by default)
         """
         self.host = host
         self.port = port
         self.table_name = table_name
+        self.metrics = metrics if metrics is not None else HBaseMetrics()
+        self._snapshot_version = None
 
     def get_connection(self):
         """
@@ -38,6 +266,7 @@ class HBaseConnector:
         Returns:
             happybase.Connection: HBase connection object
         """
+        started = time.perf_counter()
         try:
             connection = happybase.Connection(
                 host=self.host,
@@ -45,12 +274,16 @@ class HBaseConnector:
                 timeout=10000,
                 autoconnect=True
             )
-            logger.info(f"✅ Connected to HBase at {self.host}:{self.port}")
-            return connection
         except Exception as e:
+            self.metrics.inc('connect_errors')
             logger.error(f"❌ Failed to connect to HBase: {str(e)}")
             raise
 
+        self.metrics.observe('connect_latency_ms', (time.perf_counter() - started) * 1000)
+        self.metrics.inc('connections_opened')
+        _sampled_debug('connect', f"✅ Connected to HBase at {self.host}:{self.port}")
+        return connection
+
     def create_table_if_not_exists(self, column_families=['info']):
         """
         Create HBase table if it doesn't exist
@@ -73,7 +306,8 @@ class HBaseConnector:
         finally:
             connection.close()
 
-    def write_batch(self, rows: List[Dict], row_key_field='product_id', column_family='info'):
+    def write_batch(self, rows: List[Dict], row_key_field='product_id', column_family='info',
+                    retries=0, skip_unchanged=False, row_key_prefix=''):
         """
         Write a batch of rows to HBase
 
@@ -81,51 +315,157 @@ class HBaseConnector:
             rows: List of dictionaries representing rows
             row_key_field: Field to use as HBase row key
             column_family: Column family to write to
+            retries: Number of times to resend the batch on a new connection after a
+                failure, waiting RETRY_BACKOFF_SECONDS (doubled each time) in between
+            skip_unchanged: Store a content fingerprint per row and only send rows
+                whose fingerprint differs from the one already in HBase. Without it,
+                any stored fingerprint is deleted, as it no longer describes the row
+            row_key_prefix: String prepended to every row key (e.g. a snapshot version)
+        """
+        if retries < 0:
+            raise ValueError(f"retries must be >= 0, got {retries}")
+
+        fp_column = f"{column_family}:{FINGERPRINT_COLUMN}".encode()
+
+        puts = []
+        for row in rows:
+            if row_key_field not in row:
+                logger.warning(f"⚠️  Skipping row without key field '{row_key_field}'")
+                self.metrics.inc('rows_skipped')
+                continue
+
+            # Create row key
+            row_key = f"{row_key_prefix}{row[row_key_field]}".encode()
+
+            # Prepare columns (exclude row key from data)
+            columns = {}
+            for key, value in row.items():
+                if key != row_key_field and value is not None:
+                    # Convert all values to strings for HBase
+                    col_name = f"{column_family}:{key}".encode()
+                    col_value = str(value).encode()
+                    columns[col_name] = col_value
+
+            if skip_unchanged:
+                columns[fp_column] = row_fingerprint(columns)
+
+            puts.append((row_key, columns))
+
+        for attempt in range(retries + 1):
+            connection = None
+
+            try:
+                connection = self.get_connection()
+                table = connection.table(self.table_name)
+
+                changed = puts
+                if skip_unchanged and puts:
+                    # One multi-get for the stored fingerprints of this batch
+                    stored = dict(table.rows([row_key for row_key, _ in puts], columns=[fp_column]))
+                    changed = [(row_key, columns) for row_key, columns in puts
+                               if stored.get(row_key, {}).get(fp_column) != columns[fp_column]]
+
+                if not changed:
+                    break
+
+                batch = table.batch()
+
+                # Write to batch
+                for row_key, columns in changed:
+                    batch.put(row_key, columns)
+                    if not skip_unchanged:
+                        batch.delete(row_key, columns=[fp_column])
+
+                # Send batch
+                started = time.perf_counter()
+                batch.send()
+                self.metrics.observe('batch_send_latency_ms', (time.perf_counter() - started) * 1000)
+                self.metrics.inc('batches_sent')
+                break
+
+            except Exception as e:
+                # A failed connect is already counted as a connect error
+                if connection is not None:
+                    self.metrics.inc('write_errors')
+                if attempt < retries:
+                    self.metrics.inc('write_retries')
+                    backoff = RETRY_BACKOFF_SECONDS * 2 ** attempt
+                    logger.warning(f"⚠️  Batch write failed ({str(e)}), retrying in {backoff:.1f}s "
+                                   f"({attempt + 1}/{retries})...")
+                    time.sleep(backoff)
+                    continue
+                logger.error(f"❌ Error writing batch to HBase: {str(e)}")
+                raise
+            finally:
+                if connection is not None:
+                    connection.close()
+
+        batch_bytes = sum(len(row_key) + sum(len(name) + len(value) for name, value in columns.items())
+                          for row_key, columns in changed)
+
+        self.metrics.inc('rows_written', len(changed))
+        self.metrics.inc('rows_unchanged', len(puts) - len(changed))
+        self.metrics.inc('bytes_written', batch_bytes)
+        _sampled_debug('batch', f"✅ Wrote {len(changed)} of {len(puts)} rows to HBase table '{self.table_name}'")
+
+    def scan_fingerprinted_keys(self, column_family='info'):
+        """
+        Return the row keys of all rows that carry a content fingerprint
+
+        Only the fingerprint column is requested and values are stripped
+        server-side, so the scan transfers little more than the keys.
         """
         connection = self.get_connection()
+        fp_column = f"{column_family}:{FINGERPRINT_COLUMN}".encode()
 
         try:
             table = connection.table(self.table_name)
-            batch = table.batch()
-
-            write_count = 0
-            for row in rows:
-                if row_key_field not in row:
-                    logger.warning(f"⚠️  Skipping row without key field '{row_key_field}'")
-                    continue
+            return {key for key, _ in table.scan(columns=[fp_column], filter=b'KeyOnlyFilter()')}
+        except Exception as e:
+            self.metrics.inc('read_errors')
+            logger.error(f"❌ Error scanning row keys: {str(e)}")
+            raise
+        finally:
+            connection.close()
 
-                # Create row key
-                row_key = str(row[row_key_field])
+    def delete_rows(self, row_keys):
+        """
+        Delete rows in a single batch
 
-                # Prepare columns (exclude row key from data)
-                columns = {}
-                for key, value in row.items():
-                    if key != row_key_field and value is not None:
-                        # Convert all values to strings for HBase
-                        col_name = f"{column_family}:{key}".encode()
-                        col_value = str(value).encode()
-                        columns[col_name] = col_value
+        Args:
+            row_keys: Iterable of encoded row keys
+        """
+        row_keys = list(row_keys)
+        if not row_keys:
+            return
 
-                # Write to batch
-                batch.put(row_key.encode(), columns)
-                write_count += 1
+        connection = self.get_connection()
 
-            # Send batch
-            batch.send()
-            logger.info(f"✅ Successfully wrote {write_count} rows to HBase table '{self.table_name}'")
+        try:
+            table = connection.table(self.table_name)
+            with table.batch(batch_size=DELETE_BATCH_SIZE) as batch:
+                for row_key in row_keys:
+                    batch.delete(row_key)
 
+            self.metrics.inc('rows_deleted', len(row_keys))
+            logger.info(f"🗑️  Deleted {len(row_keys)} rows from HBase table '{self.table_name}'")
         except Exception as e:
-            logger.error(f"❌ Error writing batch to HBase: {str(e)}")
+            self.metrics.inc('write_errors')
+            logger.error(f"❌ Error deleting rows: {str(e)}")
             raise
         finally:
             connection.close()
 
-    def read_table(self, limit=None):
+    def read_table(self, limit=None, row_prefix=None):
         """
         Read rows from HBase table
 
         Args:
             limit: Maximum number of rows to read (None for all)
+            row_prefix: Only read rows whose key starts with this prefix; the
+                prefix is stripped from the returned row_key
+
+        The snapshot pointer row is not data and is never returned.
 
         Returns:
             List of dictionaries representing rows
@@ -137,13 +477,22 @@ class HBaseConnector:
             rows = []
 
             count = 0
-            for key, data in table.scan():
-                row = {'row_key': key.decode()}
+            read_bytes = 0
+            started = time.perf_counter()
+            prefix = row_prefix.encode() if row_prefix else None
+            for key, data in table.scan(row_prefix=prefix):
+                if key == SNAPSHOT_POINTER_ROW:
+                    continue
+
+                row = {'row_key': key[len(prefix):].decode() if prefix else key.decode()}
+                read_bytes += len(key)
 
                 # Decode columns
                 for col_name, col_value in data.items():
+                    read_bytes += len(col_name) + len(col_value)
                     col_name_decoded = col_name.decode().split(':', 1)[1]  # Remove column family prefix
-                    row[col_name_decoded] = col_value.decode()
+                    if col_name_decoded != FINGERPRINT_COLUMN:
+                        row[col_name_decoded] = col_value.decode()
 
                 rows.append(row)
                 count += 1
@@ -151,15 +500,206 @@ class HBaseConnector:
                 if limit and count >= limit:
                     break
 
+            elapsed = time.perf_counter() - started
+            self.metrics.observe('scan_latency_ms', elapsed * 1000)
+            self.metrics.inc('scan_seconds', elapsed)
+            self.metrics.inc('rows_read', len(rows))
+            self.metrics.inc('bytes_read', read_bytes)
+
             logger.info(f"✅ Read {len(rows)} rows from HBase table '{self.table_name}'")
             return rows
 
         except Exception as e:
+            self.metrics.inc('read_errors')
             logger.error(f"❌ Error reading from HBase: {str(e)}")
             raise
         finally:
             connection.close()
 
+    def mark_snapshot_pending(self, version, column_family='info'):
+        """
+        Record `version` in the pointer row before any of its rows are written
+
+        Args:
+            version: Snapshot version about to be written
+            column_family: Column family of the pointer row
+        """
+        connection = self.get_connection()
+
+        try:
+            table = connection.table(self.table_name)
+            table.put(SNAPSHOT_POINTER_ROW, {f"{column_family}:pending_{version}".encode(): b'1'})
+        except Exception as e:
+            self.metrics.inc('write_errors')
+            logger.error(f"❌ Error marking snapshot pending: {str(e)}")
+            raise
+        finally:
+            connection.close()
+
+    def publish_snapshot(self, version, row_count, column_family='info'):
+        """
+        Atomically point readers at snapshot `version`
+
+        The pointer and the version's manifest entry are written in one row put,
+        which HBase applies atomically. The pointer is re-read first: a version
+        older than the published one (an overlapping run finished earlier) or
+        one whose pending marker is gone (its rows were garbage-collected) is
+        refused, so the pointer never moves back or to incomplete rows. Thrift
+        offers no check-and-put, so two runs publishing at the same instant can
+        still race; schedule snapshot runs so that they do not overlap.
+
+        Args:
+            version: Snapshot version whose rows are completely written
+            row_count: Number of rows in the snapshot
+            column_family: Column family of the pointer row
+
+        Raises:
+            ValueError: If `version` may not be published
+        """
+        current, _, pending = self._read_snapshot_pointer(column_family)
+        if current is not None and version < current:
+            raise ValueError(f"Snapshot '{version}' is older than the published '{current}'")
+        if version not in pending:
+            raise ValueError(f"Snapshot '{version}' is not pending (never marked or garbage-collected)")
+
+        connection = self.get_connection()
+
+        try:
+            table = connection.table(self.table_name)
+            table.put(SNAPSHOT_POINTER_ROW, {
+                f"{column_family}:current".encode(): version.encode(),
+                f"{column_family}:v_{version}".encode(): str(row_count).encode(),
+            })
+            self._snapshot_version = version
+            logger.info(f"📌 Published snapshot '{version}' ({row_count} rows) in '{self.table_name}'")
+
+            # The manifest entry supersedes the pending marker; a leftover marker is ignored
+            try:
+                table.delete(SNAPSHOT_POINTER_ROW, columns=[f"{column_family}:pending_{version}".encode()])
+            except Exception as e:
+                logger.warning(f"⚠️  Could not clear pending marker of '{version}': {str(e)}")
+        except Exception as e:
+            self.metrics.inc('write_errors')
+            logger.error(f"❌ Error publishing snapshot: {str(e)}")
+            raise
+        finally:
+            connection.close()
+
+    def list_snapshots(self, column_family='info'):
+        """
+        Return the published snapshots
+
+        Returns:
+            Tuple of (current version or None, {version: row_count} of all published versions)
+        """
+        current, versions, _ = self._read_snapshot_pointer(column_family)
+        return current, versions
+
+    def _read_snapshot_pointer(self, column_family='info'):
+        """
+        Read and decode the snapshot pointer row
+
+        Returns:
+            Tuple of (current version or None, {version: row_count} of published
+            versions, set of versions marked pending and not published)
+        """
+        connection = self.get_connection()
+
+        try:
+            table = connection.table(self.table_name)
+            pointer = table.row(SNAPSHOT_POINTER_ROW)
+        except Exception as e:
+            self.metrics.inc('read_errors')
+            logger.error(f"❌ Error reading snapshot pointer: {str(e)}")
+            raise
+        finally:
+            connection.close()
+
+        current = pointer.get(f"{column_family}:current".encode())
+        manifest_prefix = f"{column_family}:v_".encode()
+        pending_prefix = f"{column_family}:pending_".encode()
+        versions = {
+            col_name[len(manifest_prefix):].decode(): int(col_value)
+            for col_name, col_value in pointer.items()
+            if col_name.startswith(manifest_prefix)
+        }
+        pending = {
+            col_name[len(pending_prefix):].decode()
+            for col_name in pointer
+            if col_name.startswith(pending_prefix)
+        }
+        return (current.decode() if current else None), versions, pending - set(versions)
+
+    def get_current_snapshot(self, refresh=False):
+        """
+        Resolve the published snapshot version
+
+        The pointer is read once per connector and cached; pass refresh=True
+        to pick up a newer snapshot.
+        """
+        if refresh or self._snapshot_version is None:
+            self._snapshot_version = self.list_snapshots()[0]
+        return self._snapshot_version
+
+    def read_snapshot(self, version=None, limit=None):
+        """
+        Read the rows of a snapshot (the published one by default)
+
+        Returns:
+            List of dictionaries; row_key is the original key without version prefix
+        """
+        version = version or self.get_current_snapshot()
+        if version is None:
+            logger.warning(f"⚠️  No snapshot published in table '{self.table_name}'")
+            return []
+        return self.read_table(limit=limit, row_prefix=snapshot_row_prefix(version))
+
+    def gc_snapshots(self, keep=2, column_family='info', pending_lease=SNAPSHOT_PENDING_LEASE_SECONDS):
+        """
+        Delete all but the newest `keep` snapshots in bulk
+
+        The published version is never deleted. Keeping at least two versions
+        lets readers that cached the previous pointer finish their reads.
+        Pending versions older than `pending_lease` seconds belong to runs that
+        failed before publishing and are deleted as well; younger ones may
+        still be in progress and are left alone.
+
+        Returns:
+            List of deleted versions
+        """
+        current, versions, pending = self._read_snapshot_pointer(column_family)
+        newest = sorted(versions, reverse=True)[:max(keep, 1)]
+        expired = [version for version in versions if version not in newest and version != current]
+        abandoned = sorted(version for version in pending if snapshot_age_seconds(version) > pending_lease)
+
+        for version in expired:
+            self._delete_snapshot(version, f"{column_family}:v_{version}")
+        for version in abandoned:
+            self._delete_snapshot(version, f"{column_family}:pending_{version}")
+
+        return expired + abandoned
+
+    def _delete_snapshot(self, version, pointer_column):
+        """Delete all rows of snapshot `version`, then its column in the pointer row"""
+        connection = self.get_connection()
+        try:
+            table = connection.table(self.table_name)
+            prefix = snapshot_row_prefix(version).encode()
+            keys = [key for key, _ in table.scan(row_prefix=prefix, filter=b'KeyOnlyFilter()')]
+        finally:
+            connection.close()
+
+        self.delete_rows(keys)
+
+        connection = self.get_connection()
+        try:
+            # Drop the pointer entry only after the rows are gone
+            connection.table(self.table_name).delete(SNAPSHOT_POINTER_ROW, columns=[pointer_column.encode()])
+        finally:
+            connection.close()
+
+        logger.info(f"🧹 Garbage-collected snapshot '{version}' ({len(keys)} rows)")
+
     def delete_table(self):
         """
         Delete the HBase table (use with caution!)
@@ -180,7 +720,9 @@ class HBaseConnector:
 
 
 def write_partition_to_hbase(partition_iter: Iterator, hbase_host='hbase', hbase_port=9090,
-                              table_name='recommendations', row_key_field='product_id'):
+                              table_name='recommendations', row_key_field='product_id',
+                              metrics_accumulator=None, retries=0, skip_unchanged=False,
+                              row_key_prefix='', keys_accumulator=None):
     """
     Function to write a partition of DataFrame to HBase
     Used with DataFrame.foreachPartition()
@@ -191,12 +733,17 @@ def write_partition_to_hbase(partition_iter: Iterator, hbase_host='hbase', hbase
         hbase_port: HBase Thrift server port
         table_name: Target HBase table name
         row_key_field: Field to use as row key
+        metrics_accumulator: Optional Spark accumulator collecting HBaseMetrics
+        retries: Number of batch resend attempts after a failure
+        skip_unchanged: Only write rows whose content fingerprint changed
+        row_key_prefix: String prepended to every row key
+        keys_accumulator: Optional Spark accumulator collecting the written row keys
     """
     # Convert iterator to list (required for batch processing)
     rows = list(partition_iter)
 
     if not rows:
-        logger.info("ℹ️  Empty partition, skipping...")
+        logger.debug("ℹ️  Empty partition, skipping...")
         return
 
     # Write this partition to HBase
@@ -206,14 +753,22 @@ def write_partition_to_hbase(partition_iter: Iterator, hbase_host='hbase', hbase
     rows_dict = [row.asDict() for row in rows]
 
     try:
-        connector.write_batch(rows_dict, row_key_field=row_key_field)
+        connector.write_batch(rows_dict, row_key_field=row_key_field, retries=retries,
+                              skip_unchanged=skip_unchanged, row_key_prefix=row_key_prefix)
+        if keys_accumulator is not None:
+            keys_accumulator.add({f"{row_key_prefix}{row[row_key_field]}".encode()
+                                  for row in rows_dict if row_key_field in row})
     except Exception as e:
         logger.error(f"❌ Failed to write partition: {str(e)}")
         raise
+    finally:
+        if metrics_accumulator is not None:
+            metrics_accumulator.add(connector.metrics)
 
 
 def dataframe_to_hbase(df, table_name='recommendations', row_key_field='product_id',
-                        hbase_host='hbase', hbase_port=9090):
+                        hbase_host='hbase', hbase_port=9090, retries=0, skip_unchanged=False,
+                        delete_missing=False, row_key_prefix=''):
     """
     Write Spark DataFrame to HBase using foreachPartition for efficiency
 
@@ -223,9 +778,26 @@ def dataframe_to_hbase(df, table_name='recommendations', row_key_field='product_
         row_key_field: Field to use as HBase row key
         hbase_host: HBase Thrift server hostname
         hbase_port: HBase Thrift server port
+        retries: Number of batch resend attempts after a failure
+        skip_unchanged: Diff-aware mode; store a content fingerprint per row and
+            skip rows whose fingerprint is unchanged since the last write
+        delete_missing: With skip_unchanged, delete fingerprinted rows that are
+            not part of this write. The keys are collected while writing, so
+            `df` is evaluated only once.
+        row_key_prefix: String prepended to every row key
+
+    Returns:
+        HBaseMetrics aggregated from all executors
     """
+    if delete_missing and not skip_unchanged:
+        raise ValueError("delete_missing requires skip_unchanged (diff-aware writes)")
+
     logger.info(f"📤 Writing DataFrame to HBase table '{table_name}'...")
 
+    spark_context = df.sparkSession.sparkContext
+    metrics_accumulator = spark_context.accumulator(HBaseMetrics(), HBaseMetricsAccumulatorParam())
+    keys_accumulator = spark_context.accumulator(set(), KeySetAccumulatorParam()) if delete_missing else None
+
     # Use foreachPartition for efficient batch writes
     df.foreachPartition(
         lambda partition: write_partition_to_hbase(
@@ -233,11 +805,72 @@ def dataframe_to_hbase(df, table_name='recommendations', row_key_field='product_
             hbase_host=hbase_host,
             hbase_port=hbase_port,
             table_name=table_name,
-            row_key_field=row_key_field
+            row_key_field=row_key_field,
+            metrics_accumulator=metrics_accumulator,
+            retries=retries,
+            skip_unchanged=skip_unchanged,
+            row_key_prefix=row_key_prefix,
+            keys_accumulator=keys_accumulator
         )
     )
 
-    logger.info(f"✅ DataFrame written to HBase table '{table_name}'")
+    metrics = metrics_accumulator.value
+
+    if delete_missing:
+        connector = HBaseConnector(host=hbase_host, port=hbase_port, table_name=table_name,
+                                   metrics=metrics)
+        connector.delete_rows(connector.scan_fingerprinted_keys() - keys_accumulator.value)
+
+    logger.info(f"✅ DataFrame written to HBase table '{table_name}' "
+                f"({metrics.counters.get('rows_written', 0)} rows written, "
+                f"{metrics.counters.get('rows_unchanged', 0)} unchanged, "
+                f"{metrics.counters.get('rows_deleted', 0)} deleted, "
+                f"{metrics.counters.get('bytes_written', 0)} bytes)")
+    return metrics
+
+
+def dataframe_to_hbase_snapshot(df, table_name='recommendations', row_key_field='product_id',
+                                hbase_host='hbase', hbase_port=9090, retries=0, keep=2):
+    """
+    Write a DataFrame as a new versioned snapshot and publish it atomically
+
+    Rows are written under '<version>#<row key>'. Readers keep seeing the
+    previous snapshot until the pointer row is flipped after the write
+    completes; older snapshots beyond `keep` are then deleted in bulk. The
+    version is marked pending before the write, so rows left by a failed run
+    are collected once its pending lease has expired. Publishing fails with
+    ValueError if a newer snapshot was published in the meantime.
+
+    Args:
+        df: Spark DataFrame to write
+        table_name: Target HBase table name
+        row_key_field: Field to use as HBase row key (after the version prefix)
+        hbase_host: HBase Thrift server hostname
+        hbase_port: HBase Thrift server port
+        retries: Number of batch resend attempts after a failure
+        keep: Number of most recent snapshots to retain
+
+    Returns:
+        Tuple of (published version, HBaseMetrics)
+    """
+    version = new_snapshot_version()
+    HBaseConnector(host=hbase_host, port=hbase_port, table_name=table_name).mark_snapshot_pending(version)
+
+    metrics = dataframe_to_hbase(
+        df,
+        table_name=table_name,
+        row_key_field=row_key_field,
+        hbase_host=hbase_host,
+        hbase_port=hbase_port,
+        retries=retries,
+        row_key_prefix=snapshot_row_prefix(version)
+    )
+
+    connector = HBaseConnector(host=hbase_host, port=hbase_port, table_name=table_name, metrics=metrics)
+    connector.publish_snapshot(version, metrics.counters.get('rows_written', 0))
+    connector.gc_snapshots(keep=keep)
+
+    return version, metrics
 
 
 if __name__ == "__main__":
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Job Metrics Module for PySpark
+Collects per-step timing and Spark stage metrics for the recommendations job
+
+Each pipeline step runs inside its own Spark job group. When the step finishes
+the job and stage IDs are resolved through the status tracker, and the detailed
+stage metrics (input rows, shuffle bytes, spill, task skew) are fetched from the
+driver's monitoring REST API when the Spark UI is enabled.
+
+Both sources are fed asynchronously by the listener bus, so the collector waits
+for the bus to drain (up to LISTENER_DRAIN_TIMEOUT_MS) before reading them;
+if that is not possible the last task-end events of a step may be missing.
+"""
+
+import json
+import time
+import urllib.request
+from contextlib import contextmanager, nullcontext
+
+# Maximum time to wait for pending listener events before reading step metrics
+LISTENER_DRAIN_TIMEOUT_MS = 5000
+
+
+class JobMetrics:
+    """
+    Collects a run report for a sequence of named pipeline steps
+    """
+
+    def __init__(self, spark, verbose=False):
+        """
+        Initialize the metrics collector
+
+        Args:
+            spark: Active SparkSession
+            verbose: Print per-stage details in the console summary
+        """
+        self.spark = spark
+        self.sc = spark.sparkContext
+        self.verbose = verbose
+        self.steps = []
+        self.run_started = time.time()
+
+    @contextmanager
+    def step(self, name):
+        """
+        Measure a pipeline step
+
+        Every Spark job triggered inside the block is tagged with a job group
+        so its stages can be attributed to this step afterwards.
+
+        Args:
+            name: Step name used in the report (e.g. 'read', 'sink:hbase')
+        """
+        group_id = f"step-{len(self.steps):02d}-{name}"
+        previous_group = self.sc.getLocalProperty("spark.jobGroup.id")
+        previous_description = self.sc.getLocalProperty("spark.job.description")
+        self.sc.setJobGroup(group_id, name)
+
+        started = time.time()
+        status = "ok"
+        try:
+            yield
+        except Exception:
+            status = "failed"
+            raise
+        finally:
+            wall_time = time.time() - started
+            self.sc.setLocalProperty("spark.jobGroup.id", previous_group)
+            self.sc.setLocalProperty("spark.job.description", previous_description)
+            self.steps.append(self._collect_step(name, group_id, wall_time, status))
+
+    def _collect_step(self, name, group_id, wall_time, status):
+        """Resolve jobs and stages of a finished step into a report entry"""
+        self._wait_for_listener_bus()
+        tracker = self.sc.statusTracker()
+        job_ids = sorted(tracker.getJobIdsForGroup(group_id))
+
+        stage_ids = []
+        for job_id in job_ids:
+            job_info = tracker.getJobInfo(job_id)
+            if job_info is not None:
+                stage_ids.extend(job_info.stageIds)
+
+        stages = [self._collect_stage(tracker, stage_id) for stage_id in sorted(set(stage_ids))]
+        # The status tracker also lists stages skipped because their shuffle
+        # output was reused (common with AQE); they ran no tasks, so drop them
+        stages = [stage for stage in stages if stage is not None and not stage["skipped"]]
+
+        totals = {
+            "tasks": sum(stage["num_tasks"] for stage in stages),
+            "input_rows": sum(stage.get("input_rows", 0) for stage in stages),
+            "input_bytes": sum(stage.get("input_bytes", 0) for stage in stages),
+            "shuffle_read_bytes": sum(stage.get("shuffle_read_bytes", 0) for stage in stages),
+            "shuffle_write_bytes": sum(stage.get("shuffle_write_bytes", 0) for stage in stages),
+            "memory_spilled_bytes": sum(stage.get("memory_spilled_bytes", 0) for stage in stages),
+            "disk_spilled_bytes": sum(stage.get("disk_spilled_bytes", 0) for stage in stages),
+            "max_task_skew": max((stage.get("task_skew", 0.0) for stage in stages), default=0.0),
+        }
+
+        return {
+            "name": name,
+            "status": status,
+            "wall_time_seconds": round(wall_time, 3),
+            "job_ids": job_ids,
+            "stage_ids": [stage["stage_id"] for stage in stages],
+            "totals": totals,
+            "stages": stages,
+        }
+
+    def _wait_for_listener_bus(self):
+        """
+        Wait until the listener bus has delivered pending task/stage events
+
+        Uses the JVM LiveListenerBus (not part of the public PySpark API);
+        failures are ignored and the metrics are read as they are.
+        """
+        try:
+            self.sc._jsc.sc().listenerBus().waitUntilEmpty(LISTENER_DRAIN_TIMEOUT_MS)
+        except Exception:
+            pass
+
+    def _collect_stage(self, tracker, stage_id):
+        """Build the metrics entry for a single stage"""
+        stage_info = tracker.getStageInfo(stage_id)
+        if stage_info is None:
+            return None
+
+        stage = {
+            "stage_id": stage_id,
+            "attempt_id": stage_info.currentAttemptId,
+            "name": stage_info.name,
+            "planned_tasks": stage_info.numTasks,
+            "num_tasks": stage_info.numCompletedTasks + stage_info.numFailedTasks,
+            "failed_tasks": stage_info.numFailedTasks,
+        }
+        stage.update(self._fetch_stage_details(stage_id, stage_info.currentAttemptId))
+
+        # Prefer the REST status; without the UI, a stage that ran no tasks was skipped
+        if "status" in stage:
+            stage["skipped"] = stage["status"] == "SKIPPED"
+        else:
+            stage["skipped"] = stage["num_tasks"] == 0 and stage_info.numActiveTasks == 0
+        return stage
+
+    def _fetch_stage_details(self, stage_id, attempt_id):
+        """
+        Fetch I/O, shuffle, spill and skew metrics from the monitoring REST API
+
+        Returns an empty dict when the Spark UI is disabled or unreachable.
+        """
+        ui_url = self.sc.uiWebUrl
+        if not ui_url:
+            return {}
+
+        base = f"{ui_url}/api/v1/applications/{self.sc.applicationId}/stages/{stage_id}/{attempt_id}"
+
+        try:
+            data = _get_json(base)
+        except Exception:
+            return {}
+
+        details = {
+            "status": data.get("status"),
+            "input_rows": data.get("inputRecords", 0),
+            "input_bytes": data.get("inputBytes", 0),
+            "shuffle_read_bytes": data.get("shuffleReadBytes", 0),
+            "shuffle_write_bytes": data.get("shuffleWriteBytes", 0),
+            "memory_spilled_bytes": data.get("memoryBytesSpilled", 0),
+            "disk_spilled_bytes": data.get("diskBytesSpilled", 0),
+            "executor_run_time_ms": data.get("executorRunTime", 0),
+        }
+
+        if details["status"] == "SKIPPED":
+            return details
+
+        try:
+            summary = _get_json(f"{base}/taskSummary?quantiles=0.5,1.0")
+        except Exception:
+            summary = {}
+
+        # Skew: slowest task divided by the median task
+        run_times = summary.get("executorRunTime") or [0, 0]
+        median_ms, max_ms = run_times[0], run_times[-1]
+        details["task_time_median_ms"] = median_ms
+        details["task_time_max_ms"] = max_ms
+        details["task_skew"] = round(max_ms / median_ms, 2) if median_ms else 0.0
+
+        return details
+
+    def report(self):
+        """
+        Build the run report
+
+        Returns:
+            Dictionary with application info and one entry per step
+        """
+        return {
+            "application_id": self.sc.applicationId,
+            "application_name": self.sc.appName,
+            "spark_version": self.spark.version,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.run_started)),
+            "total_wall_time_seconds": round(time.time() - self.run_started, 3),
+            "steps": self.steps,
+        }
+
+    def write_report(self, path):
+        """
+        Write the run report as JSON
+
+        Args:
+            path: Local file path on the driver
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
+
+        print(f"✅ Run report written to {path}")
+
+    def print_summary(self):
+        """Print a concise per-step table (and per-stage details in verbose mode)"""
+        print("\n⏱️  Step Metrics:")
+        print("=" * 100)
+        print(f"{'step':<24}{'wall(s)':>9}{'jobs':>6}{'stages':>8}{'tasks':>7}"
+              f"{'input rows':>13}{'shuffle R/W':>17}{'spill':>9}{'skew':>7}")
+        print("-" * 100)
+
+        for step in self.steps:
+            totals = step["totals"]
+            shuffle = (f"{_format_bytes(totals['shuffle_read_bytes'])}/"
+                       f"{_format_bytes(totals['shuffle_write_bytes'])}")
+            spill = _format_bytes(totals["memory_spilled_bytes"] + totals["disk_spilled_bytes"])
+            name = step["name"] if step["status"] == "ok" else f"{step['name']} (failed)"
+
+            print(f"{name:<24}{step['wall_time_seconds']:>9.2f}{len(step['job_ids']):>6}"
+                  f"{len(step['stage_ids']):>8}{totals['tasks']:>7}{totals['input_rows']:>13,}"
+                  f"{shuffle:>17}{spill:>9}{totals['max_task_skew']:>7.1f}")
+
+            if self.verbose:
+                for stage in step["stages"]:
+                    print(f"    stage {stage['stage_id']:<5} tasks={stage['num_tasks']:<5} "
+                          f"rows={stage.get('input_rows', 0):,} "
+                          f"shuffleR={_format_bytes(stage.get('shuffle_read_bytes', 0))} "
+                          f"shuffleW={_format_bytes(stage.get('shuffle_write_bytes', 0))} "
+                          f"skew={stage.get('task_skew', 0.0):.1f}  {stage['name'][:40]}")
+
+        print("=" * 100)
+
+
+def track(metrics, name):
+    """
+    Return the step context for `metrics`, or a no-op context when it is None
+
+    Args:
+        metrics: JobMetrics instance or None
+        name: Step name
+    """
+    return metrics.step(name) if metrics is not None else nullcontext()
+
+
+def _get_json(url, timeout=5):
+    """GET a JSON document from the Spark monitoring API"""
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return json.loads(response.read().decode("utf-8"))
+
+
+def _format_bytes(num_bytes):
+    """Format a byte count for the console table"""
+    for unit in ("B", "KB", "MB", "GB"):
+        if num_bytes < 1024:
+            return f"{num_bytes:.0f}{unit}" if unit == "B" else f"{num_bytes:.1f}{unit}"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f}TB"
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Recommendation Driver Service
+Keeps one SparkSession alive and serves analysis requests over a local socket
+
+Submitting find_recommendations.py pays JVM and executor startup on every run and
+throws away all cached data. This service is submitted once; afterwards each
+request reuses the running session and the cached source DataFrames.
+
+Protocol: one JSON object per line in, one JSON object per line out.
+
+    {"op": "full_analysis", "path": "hdfs://..."}
+    {"op": "incremental_update", "path": "hdfs://...", "delta_path": "hdfs://..."}
+    {"op": "top_n", "category": "Electronics", "n": 10}
+    {"op": "stats"} | {"op": "ping"} | {"op": "shutdown"}
+
+When started with --catalog, sources are compact integer-coded events and the
+catalog dimension is cached once and shared by all requests.
+
+Usage:
+    spark-submit --py-files hbase_connector.py,job_metrics.py,find_recommendations.py \
+        recommendation_service.py serve --port 7979
+    python3 recommendation_service.py request top_n --category Books --n 5
+"""
+
+import argparse
+import json
+import socket
+import socketserver
+import sys
+import time
+
+from find_recommendations import (
+    create_spark_session,
+    read_clickstream_from_hdfs,
+    read_compact_clickstream,
+    CLICKSTREAM_SCHEMA,
+    analyze_top_products,
+    analyze_top_categories,
+    analyze_user_behavior,
+    compute_product_stats,
+    with_product_details,
+    top_products_for_category,
+    save_to_hbase,
+)
+from pyspark.sql.functions import desc
+
+DEFAULT_PATH = "hdfs://namenode:9000/data/clickstream_large.txt"
+DEFAULT_PORT = 7979
+
+# Seconds a connected client may stay idle before it is dropped, so one open
+# connection cannot block the single-threaded server
+CLIENT_IDLE_TIMEOUT = 30
+
+
+class RecommendationService:
+    """
+    Executes analysis requests against a long-lived SparkSession
+    """
+
+    def __init__(self, spark, default_path=DEFAULT_PATH, hbase_host='hbase', hbase_port=9090,
+                 boot_seconds=0.0, catalog_path=None):
+        """
+        Initialize the service
+
+        Args:
+            spark: Active SparkSession (kept open for the service lifetime)
+            default_path: Source path used when a request does not name one
+            hbase_host: HBase Thrift server hostname
+            hbase_port: HBase Thrift server port
+            boot_seconds: Time spent creating the SparkSession (cold start)
+            catalog_path: Product catalog path; sources are then read as compact events
+        """
+        self.spark = spark
+        self.default_path = default_path
+        self.hbase_host = hbase_host
+        self.hbase_port = hbase_port
+        self.boot_seconds = boot_seconds
+        self.catalog_path = catalog_path
+        self.catalog = None
+        self.sources = {}
+        self.latencies = {}
+
+    def get_source(self, path):
+        """
+        Return the cached source DataFrame for `path`, reading it on first use
+
+        A cold load is a single scan: the schema is explicit and the DataFrame
+        is cached before the reader's count, which materializes the cache.
+
+        Returns:
+            Tuple of (DataFrame, was_cached)
+        """
+        if path in self.sources:
+            return self.sources[path], True
+
+        if self.catalog_path:
+            # The catalog is read and cached on the first load only, then shared
+            df, self.catalog = read_compact_clickstream(self.spark, path, self.catalog_path, cache=True,
+                                                        catalog=self.catalog)
+        else:
+            df = read_clickstream_from_hdfs(self.spark, path, schema=CLICKSTREAM_SCHEMA, cache=True)
+        self.sources[path] = df
+        return df, False
+
+    def handle(self, request):
+        """
+        Dispatch a request and wrap the result with latency information
+
+        Args:
+            request: Parsed request dictionary with an 'op' key
+
+        Returns:
+            JSON-serializable response dictionary
+        """
+        op = request.get("op")
+        handler = getattr(self, f"_op_{op}", None)
+        if handler is None:
+            return {"ok": False, "error": f"Unknown op '{op}'"}
+
+        started = time.time()
+        try:
+            response = handler(request)
+            response["ok"] = True
+        except Exception as e:
+            response = {"ok": False, "error": str(e)}
+
+        latency = time.time() - started
+        self.latencies.setdefault(op, []).append(latency)
+        response["op"] = op
+        response["latency_seconds"] = round(latency, 3)
+
+        source_state = ""
+        if "warm" in response:
+            source_state = " (warm source)" if response["warm"] else " (cold source)"
+        print(f"⏱️  {op} finished in {latency:.2f}s{source_state}")
+        return response
+
+    def _op_ping(self, request):
+        return {}
+
+    def _op_full_analysis(self, request):
+        df, warm = self.get_source(request.get("path", self.default_path))
+
+        top_products = analyze_top_products(df, self.catalog)
+        analyze_top_categories(df, self.catalog)
+        analyze_user_behavior(df, self.catalog)
+
+        if request.get("save", True):
+            save_to_hbase(top_products, hbase_host=self.hbase_host, hbase_port=self.hbase_port,
+                          save_backup=False)
+
+        return {"warm": warm, "top_products": _rows(top_products)}
+
+    def _op_incremental_update(self, request):
+        if not request.get("delta_path"):
+            raise ValueError("incremental_update requires a 'delta_path'")
+
+        path = request.get("path", self.default_path)
+        df, warm = self.get_source(path)
+
+        delta = self.spark.read.csv(request["delta_path"], header=True, schema=df.schema)
+        merged = df.unionByName(delta).cache()
+        previous_rows = df.count()  # Served from the cache
+        merged_rows = merged.count()  # Materialize before dropping the previous cache
+
+        df.unpersist()
+        self.sources[path] = merged
+
+        top_products = compute_product_stats(merged, self.catalog).orderBy(desc("hot_score")).limit(10)
+        if self.catalog is not None:
+            top_products = with_product_details(top_products, self.catalog).orderBy(desc("hot_score"))
+        if request.get("save", True):
+            save_to_hbase(top_products, hbase_host=self.hbase_host, hbase_port=self.hbase_port,
+                          save_backup=False)
+
+        return {"warm": warm, "delta_rows": merged_rows - previous_rows, "top_products": _rows(top_products)}
+
+    def _op_top_n(self, request):
+        if not request.get("category"):
+            raise ValueError("top_n requires a 'category'")
+
+        df, warm = self.get_source(request.get("path", self.default_path))
+        top_products = top_products_for_category(df, request["category"], int(request.get("n", 10)),
+                                                 self.catalog)
+        return {"warm": warm, "top_products": _rows(top_products)}
+
+    def _op_stats(self, request):
+        return {
+            "boot_seconds": round(self.boot_seconds, 3),
+            "cached_sources": list(self.sources),
+            "requests": {
+                op: {
+                    "count": len(values),
+                    "first_seconds": round(values[0], 3),
+                    "last_seconds": round(values[-1], 3),
+                    "min_seconds": round(min(values), 3),
+                }
+                for op, values in self.latencies.items()
+            },
+        }
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Reads JSON lines from a client and answers each one"""
+
+    timeout = CLIENT_IDLE_TIMEOUT
+
+    def handle(self):
+        try:
+            self._serve_lines()
+        except socket.timeout:
+            print(f"⚠️  Dropped client idle for more than {CLIENT_IDLE_TIMEOUT}s")
+
+    def _serve_lines(self):
+        for line in self.rfile:
+            line = line.strip()
+            if not line:
+                continue
+
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                response = {"ok": False, "error": f"Invalid JSON: {str(e)}"}
+                request = {}
+            else:
+                if not isinstance(request, dict):
+                    response = {"ok": False, "error": "Request must be a JSON object"}
+                    request = {}
+                elif request.get("op") == "shutdown":
+                    response = {"ok": True, "op": "shutdown"}
+                else:
+                    response = self.server.service.handle(request)
+
+            self.wfile.write((json.dumps(response, default=str) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+            if request.get("op") == "shutdown":
+                self.server.shutdown_requested = True
+                return
+
+
+class _ServiceServer(socketserver.TCPServer):
+    """Single-threaded server: requests queue up and run one at a time on the session"""
+
+    allow_reuse_address = True
+
+    def __init__(self, address, service):
+        super().__init__(address, _RequestHandler)
+        self.service = service
+        self.shutdown_requested = False
+
+
+def _rows(df):
+    """Collect a small result DataFrame into plain dictionaries"""
+    return [row.asDict() for row in df.collect()]
+
+
+def serve(host='127.0.0.1', port=DEFAULT_PORT, default_path=DEFAULT_PATH,
+          hbase_host='hbase', hbase_port=9090, preload=True, catalog_path=None):
+    """
+    Start the SparkSession and serve requests until a 'shutdown' request arrives
+
+    Args:
+        host: Interface to bind (local only by default)
+        port: TCP port to listen on
+        default_path: Source path used when a request does not name one
+        hbase_host: HBase Thrift server hostname
+        hbase_port: HBase Thrift server port
+        preload: Read and cache `default_path` before accepting requests
+        catalog_path: Product catalog path for compact event sources
+    """
+    started = time.time()
+    spark = create_spark_session("Amazon-Recommendations-Service")
+    boot_seconds = time.time() - started
+
+    service = RecommendationService(spark, default_path=default_path, hbase_host=hbase_host,
+                                    hbase_port=hbase_port, boot_seconds=boot_seconds,
+                                    catalog_path=catalog_path)
+    print(f"🚀 Spark session ready in {boot_seconds:.2f}s")
+
+    try:
+        if preload:
+            service.get_source(default_path)
+
+        with _ServiceServer((host, port), service) as server:
+            print(f"📡 Listening on {host}:{port}")
+            while not server.shutdown_requested:
+                server.handle_request()
+    finally:
+        spark.stop()
+        print("\n👋 Spark Session closed")
+
+
+def send_request(payload, host='127.0.0.1', port=DEFAULT_PORT, timeout=None):
+    """
+    Send one request to a running service and return the parsed response
+
+    Args:
+        payload: Request dictionary (must contain 'op')
+        host: Service host
+        port: Service port
+        timeout: Socket timeout in seconds (None waits indefinitely)
+    """
+    with socket.create_connection((host, port), timeout=timeout) as sock:
+        sock.sendall((json.dumps(payload) + "\n").encode("utf-8"))
+        with sock.makefile("r", encoding="utf-8") as f:
+            return json.loads(f.readline())
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Long-lived Spark driver for recommendations")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="Start the driver service")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument("--path", default=DEFAULT_PATH, help="Default source path")
+    serve_parser.add_argument("--catalog", help="Product catalog path (compact event sources)")
+    serve_parser.add_argument("--hbase-host", default="hbase")
+    serve_parser.add_argument("--hbase-port", type=int, default=9090)
+    serve_parser.add_argument("--no-preload", action="store_true",
+                              help="Do not cache the default source at startup")
+
+    request_parser = subparsers.add_parser("request", help="Send a request to a running service")
+    request_parser.add_argument("op", choices=["full_analysis", "incremental_update", "top_n",
+                                               "stats", "ping", "shutdown"])
+    request_parser.add_argument("--host", default="127.0.0.1")
+    request_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    request_parser.add_argument("--path")
+    request_parser.add_argument("--delta-path")
+    request_parser.add_argument("--category")
+    request_parser.add_argument("--n", type=int, default=10)
+    request_parser.add_argument("--no-save", action="store_true", help="Skip the HBase write")
+
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(host=args.host, port=args.port, default_path=args.path,
+              hbase_host=args.hbase_host, hbase_port=args.hbase_port,
+              preload=not args.no_preload, catalog_path=args.catalog)
+        return
+
+    payload = {"op": args.op}
+    if args.path:
+        payload["path"] = args.path
+    if args.delta_path:
+        payload["delta_path"] = args.delta_path
+    if args.op == "top_n":
+        payload["category"] = args.category
+        payload["n"] = args.n
+    if args.no_save:
+        payload["save"] = False
+
+    response = send_request(payload, host=args.host, port=args.port)
+    print(json.dumps(response, indent=2, default=str))
+    if not response.get("ok"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
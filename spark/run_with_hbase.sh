@@ -86,7 +86,7 @@ spark-submit \
     --conf spark.executor.memory=1g \
     --conf spark.executor.cores=2 \
     --conf spark.driver.memory=1g \
-    --py-files "$SCRIPT_DIR/hbase_connector.py" \
+    --py-files "$SCRIPT_DIR/hbase_connector.py,$SCRIPT_DIR/job_metrics.py" \
     "$SCRIPT_DIR/find_recommendations.py" \
     "$HDFS_PATH"
 